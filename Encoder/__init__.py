@@ -5,6 +5,24 @@ All needed by the user is done via the EAN13Encoder class:
 >>> encoder = EAN13Encoder("012345678901")
 >>> encoder.save("test.png")
 
+or, to work with the image in memory without encoding it to PNG:
+
+>>> img = encoder.get_pilimage(bar_width=3)
+
+Pure black and white 1-bit images take an eighth of the memory and
+give much smaller files:
+
+>>> encoder.save("test.png", mode="1", compress_level=9, dpi=300)
+
+Vector output is available as SVG, or drawn onto a reportlab canvas:
+
+>>> encoder.save_svg("test.svg")
+>>> encoder.draw(canvas, x, y, width, height)
+
+Large batches of codes can be encoded to compact bar patterns instead:
+
+>>> patterns = encode_many(["012345678901", "400638133393"])
+
 Implemented by Helen Taylor for HUDORA GmbH.
 Updated and ported to Python 3 by Michael Mulqueen for Method B Ltd.
 
@@ -16,16 +34,20 @@ You may use this under a BSD License.
 
 __revision__ = "$Rev: 1$"
 
+from io import BytesIO
+
 from . import encoding
-from .renderer import EAN13Renderer
+from .encoding import GUARDS
+from .patterns import EAN13Pattern, encode_many
+from .renderer import (DEFAULT_MODE, PNG_COMPRESS_LEVEL, EAN13Renderer,
+                       write_png)
+from .vector import EAN13CanvasRenderer, EAN13PDFRenderer, EAN13SVGRenderer
 # handling movement of reduce to functools python >= 2.6
 try:
     from functools import reduce
 except ImportError:
     pass
 
-GUARDS = ("101", "01010", "101")
-
 
 class EAN13Encoder:
     """Top-level class which handles the overall process of
@@ -39,11 +61,13 @@ class EAN13Encoder:
         m is the manufacturing code
         p is the product code"""
 
+        # full width digits and the like are read as ASCII digits
+        code = encoding.normalize_code(code)
         # Make sure it's 12 digits long
         if len(code) == 13:
             # cut of check digit
             code = code[:-1]
-        if code.isdigit() and len(code) == 12:
+        if code.isascii() and code.isdigit() and len(code) == 12:
             self.code = code
             self.check_digit = self.calculate_check_digit()
             self.full_code = self.code + str(self.check_digit)
@@ -102,18 +126,100 @@ class EAN13Encoder:
         # to get to a multiple of 10
         return (10 - (total % 10)) % 10
 
-    def get_imagedata(self, bar_width=3,fontSize=20,spacing=1.0):
-        """Write the barcode out to a PNG bytestream"""
+    def get_pilimage(self, bar_width=3, fontSize=20, spacing=1.0,
+                     mode=DEFAULT_MODE, digitStep=None):
+        """Render the barcode to an in-memory PIL image, without any PNG
+        encoding; mode is "L" for grayscale or "1" for black and white.
+        digitStep overrides the distance between the digits, which
+        renderer.digit_step gives by default."""
         barcode = EAN13Renderer(
             self.full_code, self.left_bars, self.right_bars, GUARDS)
-        imagedata = barcode.get_imagedata(bar_width,fontSize=fontSize,spacing=spacing)
+        img = barcode.get_pilimage(bar_width, fontSize=fontSize,
+                                   spacing=spacing, mode=mode,
+                                   digitStep=digitStep)
         self.height = barcode.height
         self.width = barcode.width
-        return imagedata
-
-    def save(self, filename, bar_width=3,fontSize=20,spacing=1.0):
-        """Write the barcode out to an image file"""
+        return img
+
+    def get_array(self, bar_width=3, fontSize=20, spacing=1.0):
+        """Render the barcode to a (height, width) uint8 NumPy array,
+        0 being black and 255 white"""
+        import numpy
+        return numpy.asarray(self.get_pilimage(bar_width, fontSize=fontSize,
+                                               spacing=spacing))
+
+    def get_imagedata(self, bar_width=3,fontSize=20,spacing=1.0,
+                      mode=DEFAULT_MODE, compress_level=PNG_COMPRESS_LEVEL,
+                      dpi=None):
+        """Write the barcode out to a PNG bytestream; see save for the
+        output options"""
+        buffer = BytesIO()
+        write_png(self.get_pilimage(bar_width, fontSize=fontSize,
+                                    spacing=spacing, mode=mode),
+                  buffer, mode=mode, compress_level=compress_level, dpi=dpi)
+        return buffer.getvalue()
+
+    def save(self, filename, bar_width=3,fontSize=20,spacing=1.0,
+             mode=DEFAULT_MODE, compress_level=PNG_COMPRESS_LEVEL, dpi=None):
+        """Write the barcode out to an image file. mode is "L" for
+        grayscale or "1" for black and white, compress_level the zlib
+        level of the PNG data (0 to 9) and dpi the resolution stored in
+        the file, if any"""
         EAN13Renderer(self.full_code,
                       self.left_bars,
                       self.right_bars,
-                      GUARDS).write_file(filename, bar_width=bar_width,fontSize=fontSize,spacing=spacing)
+                      GUARDS).write_file(filename, bar_width=bar_width,fontSize=fontSize,spacing=spacing,
+                                         mode=mode, compress_level=compress_level,
+                                         dpi=dpi)
+
+    def get_svg(self, bar_width=3, fontSize=20, spacing=1.0, header=None,
+                headerFontSize=22.5):
+        """Return the barcode as an SVG document string"""
+        barcode = EAN13SVGRenderer(
+            self.full_code, self.left_bars, self.right_bars, GUARDS)
+        svg = barcode.get_svg(bar_width, fontSize=fontSize, spacing=spacing,
+                              header=header, headerFontSize=headerFontSize)
+        self.height = barcode.height
+        self.width = barcode.width
+        return svg
+
+    def save_svg(self, filename, bar_width=3, fontSize=20, spacing=1.0,
+                 header=None, headerFontSize=22.5):
+        """Write the barcode out to an SVG file"""
+        EAN13SVGRenderer(self.full_code,
+                         self.left_bars,
+                         self.right_bars,
+                         GUARDS).write_file(filename, bar_width=bar_width,
+                                            fontSize=fontSize, spacing=spacing,
+                                            header=header,
+                                            headerFontSize=headerFontSize)
+
+    def draw(self, canvas, x, y, width, height, bar_width=3, fontSize=20,
+             spacing=1.0, header=None, headerFontSize=22.5):
+        """Draw the barcode as vector shapes onto a reportlab canvas,
+        fitted into the box at (x, y) of width x height points"""
+        EAN13CanvasRenderer(self.full_code,
+                            self.left_bars,
+                            self.right_bars,
+                            GUARDS).draw(canvas, x, y, width, height,
+                                         bar_width=bar_width,
+                                         fontSize=fontSize, spacing=spacing,
+                                         header=header,
+                                         headerFontSize=headerFontSize)
+
+    def get_pdf_content(self, width, height, bar_width=3, fontSize=20,
+                        spacing=1.0, header=None, headerFontSize=22.5,
+                        font_name="Helv"):
+        """Return PDF content stream operators drawing the barcode fitted
+        into a box of width x height points; font_name is the resource
+        name of a Helvetica font"""
+        return EAN13PDFRenderer(self.full_code,
+                                self.left_bars,
+                                self.right_bars,
+                                GUARDS).get_content(width, height,
+                                                    bar_width=bar_width,
+                                                    fontSize=fontSize,
+                                                    spacing=spacing,
+                                                    header=header,
+                                                    headerFontSize=headerFontSize,
+                                                    font_name=font_name)
@@ -0,0 +1,337 @@
+"""Headless batch generation of barcode labels
+
+Reads rows of (style_code, code, quantity) from a CSV or Excel file with
+a header line, or from JSON lines, and writes label PDFs and PNGs without
+any GUI. Labels are sized with the same rules as the barcode generator
+window and laid out on the same A4 grid:
+
+    python -m Encoder.batch labels.csv --pdf labels.pdf
+    python -m Encoder.batch labels.jsonl --pdf-dir out/ --png-dir out/
+    python -m Encoder.batch labels.csv --pdf labels.pdf --workers 8
+    python -m Encoder.batch products.xlsx --pdf labels.pdf
+    python -m Encoder.batch labels.csv --png-dir out/ --png-mode 1 --dpi 300
+    python -m Encoder.batch labels.csv --pdf labels.pdf --printer-dpi 600
+    python -m Encoder.batch labels.csv --pdf labels.pdf --cache-dir ~/.cache/barcode
+
+Columns may also be named 款号, 条形码编号 and 数量. The check digit of
+13 digit codes is verified. Rows are streamed and merged PDF pages are written as soon as they are
+full, so input files of any size can be processed in flat memory. Bad rows
+are reported on stderr and skipped; the exit status is 1 if there were
+any.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from contextlib import ExitStack
+
+from .encoding import normalize_code
+from .gtin import validate_gtins
+from .label import enable_disk_cache, render_sized_label
+from .parallel import DEFAULT_CHUNKSIZE, make_executor, render_stream
+from .renderer import DEFAULT_MODE, OUTPUT_MODES, PNG_COMPRESS_LEVEL, write_png
+from .sheet import write_label_sheet
+
+FIELDS = ("style_code", "code", "quantity")
+
+# column names accepted for each field, as used in the shop's own sheets
+FIELD_ALIASES = {
+    "style_code": ("style_code", "款号"),
+    "code": ("code", "条形码编号", "条形码"),
+    "quantity": ("quantity", "数量"),
+}
+
+# labels whose check digits are validated together
+VALIDATE_CHUNK = 4096
+
+# why a row was skipped, by RowError key; callers such as the GUI pass
+# read_labels a table of their own to report them in another language
+MESSAGES = {
+    "bad_row": "not a JSON object",
+    "bad_code": "code must be 12 or 13 digits, got %r",
+    "bad_quantity": "quantity must be a whole number, got %r",
+    "low_quantity": "quantity must be at least 1, got %d",
+    "check_digit": "check digit of %s should be %d",
+}
+
+
+class RowError(ValueError):
+    """A bad input row: the MESSAGES key of the problem and the values
+    its message is formatted with"""
+
+    def __init__(self, key, *values):
+        super().__init__(MESSAGES[key] % values)
+        self.key = key
+        self.values = values
+
+    def message(self, messages=MESSAGES):
+        """Return the message for this error from the table messages"""
+        return messages[self.key] % self.values
+
+
+def read_rows(path, fmt=None, encoding="utf-8-sig"):
+    """Yield (line number, row) from a CSV, JSON lines or Excel file; rows
+    are dicts for CSV and Excel and undecoded lines for JSON lines.
+    fmt is "csv", "jsonl" or "xlsx"; by default it follows the file
+    extension.
+    A path of "-" reads standard input."""
+    if fmt is None:
+        if path.endswith((".jsonl", ".json")):
+            fmt = "jsonl"
+        elif path.endswith((".xlsx", ".xlsm")):
+            fmt = "xlsx"
+        else:
+            fmt = "csv"
+    if fmt == "xlsx":
+        yield from read_xlsx_rows(path)
+        return
+
+    if path == "-":
+        stream = sys.stdin
+    else:
+        stream = open(path, newline="", encoding=encoding)
+    try:
+        if fmt == "jsonl":
+            for line_no, line in enumerate(stream, 1):
+                if line.strip():
+                    yield line_no, line
+        else:
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def _cell_text(value):
+    """Text of a spreadsheet cell; codes stored as numbers lose the .0"""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def read_xlsx_rows(path):
+    """Yield (row number, row dict) from the first sheet of an Excel
+    workbook, using its first row as the header. Needs openpyxl."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError("reading .xlsx files needs openpyxl, "
+                          "install it with: pip install openpyxl")
+
+    # read_only 模式按行流式读取，不把整个工作簿载入内存
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [_cell_text(value).strip() for value in next(rows, ())]
+        for row_no, values in enumerate(rows, 2):
+            if all(value is None for value in values):
+                continue
+            yield row_no, {name: _cell_text(value)
+                           for name, value in zip(header, values)}
+    finally:
+        workbook.close()
+
+
+def _field(row, name):
+    """Value of field name in row, under any of its accepted column names"""
+    for alias in FIELD_ALIASES[name]:
+        value = row.get(alias)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def make_label(row):
+    """Turn an input row into a label dict as used by write_label_sheet,
+    raising RowError for bad input. Full width digits in the code are
+    read as ASCII digits, as the GUI entries do."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            raise RowError("bad_row")
+    if not isinstance(row, dict):
+        raise RowError("bad_row")
+    code = normalize_code(str(_field(row, "code") or "").strip())
+    style_code = str(_field(row, "style_code") or "").strip()
+    quantity = _field(row, "quantity")
+    try:
+        quantity = int(quantity) if quantity is not None else 1
+    except (TypeError, ValueError):
+        raise RowError("bad_quantity", quantity)
+
+    # 与界面相同的校验：12 或 13 位数字
+    if not (code.isascii() and code.isdigit()) or len(code) < 12 or len(code) > 13:
+        raise RowError("bad_code", code)
+    if quantity < 1:
+        raise RowError("low_quantity", quantity)
+
+    return {
+        'style_code': style_code,
+        'barcode_code': code,
+        'quantity': quantity,
+    }
+
+
+def label_file_name(label):
+    """File name (without extension) used for a label, as in the GUI"""
+    if label['style_code']:
+        return f"{label['style_code']}_{label['barcode_code']}"
+    return label['barcode_code']
+
+
+def check_labels(numbered_labels, errors, messages=MESSAGES):
+    """Return the labels of a list of (line number, label) whose 13 digit
+    codes carry the right check digit, validated in one go; the others
+    are appended to errors. 12 digit codes get their check digit added
+    when rendering."""
+    full = [(line_no, label) for line_no, label in numbered_labels
+            if len(label['barcode_code']) == 13]
+    bad = set()
+    if full:
+        result = validate_gtins([label['barcode_code'] for _, label in full])
+        for (line_no, label), valid, check in zip(full, result.valid,
+                                                  result.check_digits):
+            if not valid:
+                bad.add(line_no)
+                errors.append((line_no, RowError(
+                    "check_digit", label['barcode_code'], check).message(messages)))
+    return [label for line_no, label in numbered_labels if line_no not in bad]
+
+
+def read_labels(path, errors, fmt=None, encoding="utf-8-sig",
+                chunk_size=VALIDATE_CHUNK, messages=MESSAGES):
+    """Yield valid label dicts from path, appending (line number,
+    message) to errors for every row that is skipped, with the messages
+    taken from the table messages. Check digits are validated chunk_size
+    rows at a time, so errors are not necessarily in line order."""
+    chunk = []
+    for line_no, row in read_rows(path, fmt=fmt, encoding=encoding):
+        try:
+            chunk.append((line_no, make_label(row)))
+        except RowError as e:
+            errors.append((line_no, e.message(messages)))
+            continue
+        if len(chunk) >= chunk_size:
+            yield from check_labels(chunk, errors, messages)
+            chunk = []
+    yield from check_labels(chunk, errors, messages)
+
+
+def save_png(label, dir_path, mode=DEFAULT_MODE,
+             compress_level=PNG_COMPRESS_LEVEL, dpi=None):
+    """Render a single label and write it out as PNG"""
+    image = label.get('barcode_image')
+    if image is None:
+        image = render_sized_label(label['barcode_code'], label['style_code'])
+    write_png(image, os.path.join(dir_path, label_file_name(label) + ".png"),
+              mode=mode, compress_level=compress_level, dpi=dpi)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m Encoder.batch",
+        description="Generate EAN-13 label PDFs and PNGs from CSV or JSON lines")
+    parser.add_argument("input", help="CSV or Excel file with a header line, or "
+                        "JSON lines file, with %s; - for stdin" % ", ".join(FIELDS))
+    parser.add_argument("--format", choices=("csv", "jsonl", "xlsx"),
+                        help="input format (default: from file extension)")
+    parser.add_argument("--encoding", default="utf-8-sig",
+                        help="input file encoding (default: %(default)s)")
+    parser.add_argument("--pdf", help="write all labels to one merged PDF")
+    parser.add_argument("--pdf-dir", help="write one PDF per row into this directory")
+    parser.add_argument("--png-dir", help="write one PNG per row into this directory")
+    parser.add_argument("--png-mode", choices=OUTPUT_MODES, default=DEFAULT_MODE,
+                        help="PNG pixel format, L for grayscale or 1 for black "
+                        "and white (default: %(default)s)")
+    parser.add_argument("--png-compress-level", type=int, choices=range(10),
+                        default=PNG_COMPRESS_LEVEL, metavar="0-9",
+                        help="PNG zlib compression level (default: %(default)s)")
+    parser.add_argument("--dpi", type=int,
+                        help="resolution to store in the PNG files")
+    parser.add_argument("--vector", action="store_true",
+                        help="draw PDF labels as vector shapes instead of images")
+    parser.add_argument("--printer-dpi", type=int,
+                        help="render PDF labels at this printer resolution and "
+                        "embed them unscaled")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="render labels in this many processes (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNKSIZE,
+                        help="labels per worker task (default: %(default)s)")
+    parser.add_argument("--threads", action="store_true",
+                        help="use worker threads instead of processes")
+    parser.add_argument("--cache-dir",
+                        help="keep rendered labels in this directory for later runs")
+    parser.add_argument("--cache-size", type=int, default=256,
+                        help="size limit of --cache-dir in MB (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if not (args.pdf or args.pdf_dir or args.png_dir):
+        parser.error("nothing to do, give --pdf, --pdf-dir and/or --png-dir")
+    if args.input != "-" and not os.access(args.input, os.R_OK):
+        # 先确认能读取输入，再创建任何输出文件
+        print("cannot read input file %s" % args.input, file=sys.stderr)
+        return 2
+    for dir_path in (args.pdf_dir, args.png_dir):
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+
+    if args.cache_dir:
+        enable_disk_cache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    errors = []
+    rows = 0
+
+    def process(labels):
+        """write the per-row outputs, passing labels on to the merged PDF"""
+        nonlocal rows
+        for label in labels:
+            if args.png_dir:
+                save_png(label, args.png_dir, mode=args.png_mode,
+                         compress_level=args.png_compress_level, dpi=args.dpi)
+            if args.pdf_dir:
+                file_path = os.path.join(args.pdf_dir, label_file_name(label) + ".pdf")
+                write_label_sheet(file_path, [label], vector=args.vector,
+                                  dpi=args.printer_dpi)
+            rows += 1
+            yield label
+
+    labels = read_labels(args.input, errors, fmt=args.format,
+                         encoding=args.encoding)
+    # vector PDFs need no images and printer resolution PDFs render
+    # their own, so there is nothing to render ahead
+    parallel = args.workers > 1 and (
+        args.png_dir or not (args.vector or args.printer_dpi))
+    try:
+        with ExitStack() as stack:
+            if parallel:
+                executor = stack.enter_context(
+                    make_executor(args.workers, threads=args.threads))
+                labels = render_stream(labels, executor, chunksize=args.chunk_size)
+            labels = process(labels)
+            if args.pdf:
+                placed = write_label_sheet(args.pdf, labels, vector=args.vector,
+                                           dpi=args.printer_dpi)
+            else:
+                placed = sum(label['quantity'] for label in labels)
+    except (ImportError, OSError) as e:
+        # e.g. openpyxl missing for .xlsx input, or the input or output
+        # unreadable; a PDF being written is deleted by its writer
+        print(e, file=sys.stderr)
+        return 2
+
+    for line_no, message in sorted(errors):
+        print("line %d: %s" % (line_no, message), file=sys.stderr)
+    print("%d rows, %d labels, %d errors" % (rows, placed, len(errors)),
+          file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""In-memory cache of rendered barcode images
+
+Rendered labels are keyed by everything that affects their pixels, so
+repeated previews and exports of the same code skip rendering:
+
+>>> image = render_cache.get_or_render(key, render)
+>>> render_cache.hits, render_cache.misses
+(1, 1)
+
+Cached images are shared between callers and must not be modified.
+
+With a DiskCache (see diskcache.py) attached as render_cache.disk, images
+missing from memory are looked up on disk before rendering, and newly
+rendered ones are written there too, so they outlive the process.
+"""
+
+import threading
+from collections import OrderedDict
+
+# default memory budget for rendered images
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def image_nbytes(image):
+    """Return the size of the pixel data of a PIL image in bytes"""
+    width, height = image.size
+    if image.mode == "1":
+        return (width + 7) // 8 * height
+    return width * height * len(image.getbands())
+
+
+class RenderCache:
+    """LRU cache of rendered images bounded by a byte budget.
+    Safe to share between threads."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk = None  # optional DiskCache behind the memory cache
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def max_bytes(self):
+        """the memory budget; lowering it evicts entries straight away"""
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value):
+        with self._lock:
+            self._max_bytes = value
+            self._evict()
+
+    def get(self, key):
+        """Return the cached image for key, or None on a miss"""
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+        disk = self.disk
+        if disk is not None:
+            image = disk.get(key)
+            if image is not None:
+                self._store(key, image)
+                with self._lock:
+                    self.hits += 1
+                return image
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, image):
+        """Store image under key, evicting the least recently used
+        entries to stay within the budget. Images larger than the whole
+        budget are not kept in memory. The image is also written to the
+        disk cache, if there is one."""
+        self._store(key, image)
+        disk = self.disk
+        if disk is not None:
+            disk.put(key, image)
+
+    def _store(self, key, image):
+        size = image_nbytes(image)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= image_nbytes(old)
+            if size > self._max_bytes:
+                return
+            self._entries[key] = image
+            self.current_bytes += size
+            self._evict()
+
+    def get_or_render(self, key, render):
+        """Return the cached image for key, calling render() to create
+        and store it on a miss"""
+        image = self.get(key)
+        if image is None:
+            image = render()
+            self.put(key, image)
+        return image
+
+    def clear(self):
+        """Drop all entries from memory and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _evict(self):
+        while self.current_bytes > self._max_bytes and self._entries:
+            _, image = self._entries.popitem(last=False)
+            self.current_bytes -= image_nbytes(image)
+
+
+# process-wide cache used by render_label
+render_cache = RenderCache()
@@ -0,0 +1,183 @@
+"""On-disk cache of rendered labels, shared between sessions
+
+Entries are files named by a hash of the render cache key and a version
+string, so labels rendered on one day are found again the next:
+
+>>> cache = DiskCache("~/.cache/barcode", max_bytes=256 << 20, version="1")
+>>> cache.put(key, image)
+>>> cache.get(key)
+
+label.enable_disk_cache attaches one to the shared render cache.
+
+Labels are black bars with anti-aliased text, so each image is stored as
+a packed 1-bit plane plus the few grey pixels along the glyph edges,
+about a third of the raw 8-bit size and decoded losslessly. Files are
+read through a memory map. Once the directory grows past max_bytes the
+least recently used files are deleted.
+
+Only 8-bit grayscale ("L") images are stored. Several processes may use
+the same directory; files are replaced atomically.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+
+# file extension of cache entries
+SUFFIX = ".lbl"
+
+# magic, width, height, number of grey pixels
+_header = struct.Struct("<4sHHI")
+_magic = b"BCL1"
+
+# after exceeding the budget, delete down to this fraction of it so
+# that eviction does not run on every write
+_evict_to = 0.9
+
+
+def encode_image(image):
+    """Return the cache file contents for a grayscale image"""
+    pixels = np.asarray(image)
+    grey = np.flatnonzero((pixels != 0) & (pixels != 255)).astype("<u4")
+    # rows padded to whole bytes, as in PIL's mode "1"
+    plane = np.packbits(pixels >= 128, axis=1)
+    return b"".join((_header.pack(_magic, image.width, image.height, len(grey)),
+                     plane.tobytes(), grey.tobytes(),
+                     pixels.ravel()[grey].tobytes()))
+
+
+def decode_image(buffer):
+    """Return the grayscale image stored in buffer by encode_image. The
+    image does not refer to buffer afterwards."""
+    magic, width, height, count = _header.unpack_from(buffer)
+    if magic != _magic:
+        raise ValueError("not a label cache entry")
+    stride = (width + 7) // 8
+    offset = _header.size
+    plane = np.frombuffer(buffer, np.uint8, stride * height, offset)
+    offset += stride * height
+    grey = np.frombuffer(buffer, "<u4", count, offset)
+    values = np.frombuffer(buffer, np.uint8, count, offset + 4 * count)
+
+    # a new contiguous array, so the grey pixels can be set in place
+    pixels = np.unpackbits(plane).reshape(height, stride * 8)[:, :width]
+    pixels = pixels * np.uint8(255)
+    pixels.ravel()[grey] = values
+    return Image.frombuffer("L", (width, height), pixels, "raw", "L", 0, 1)
+
+
+class DiskCache:
+    """Rendered images stored under directory, bounded by max_bytes.
+    version is part of every key; change it whenever rendering changes
+    so that old files are no longer used."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_DISK_BYTES, version=""):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.version = version
+        self.current_bytes = None  # unknown until the directory is scanned
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        """Return the file an entry for key is stored in"""
+        digest = hashlib.sha1(repr((self.version, key)).encode()).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:] + SUFFIX)
+
+    def get(self, key):
+        """Return the stored image for key, or None on a miss"""
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                image = decode_image(data)
+            # eviction goes by modification time
+            os.utime(path)
+        except (OSError, ValueError, struct.error):
+            # missing, empty or damaged files are misses
+            self.misses += 1
+            return None
+        self.hits += 1
+        return image
+
+    def put(self, key, image):
+        """Store image under key, evicting the least recently used files
+        once the directory exceeds max_bytes"""
+        if image.mode != "L":
+            return
+        data = encode_image(image)
+        path = self.path(key)
+        folder = os.path.dirname(path)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=folder)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError:
+            # the cache is only an optimization; a full or read only
+            # disk must not stop rendering
+            return
+        with self._lock:
+            if self.current_bytes is None:
+                self.current_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self.current_bytes += len(data)
+            if self.current_bytes > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        """Delete all entries"""
+        with self._lock:
+            for _, _, path in self._scan():
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self.current_bytes = 0
+
+    def _scan(self):
+        """Return (mtime, size, path) for every entry file"""
+        entries = []
+        try:
+            folders = list(os.scandir(self.directory))
+        except OSError:
+            return entries
+        for folder in folders:
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith(SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        # other processes may share the directory, so count the files
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * _evict_to:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+        self.current_bytes = total
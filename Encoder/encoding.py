@@ -1,5 +1,7 @@
 """Encoding tables and functions for EAN-13 barcode"""
 
+import unicodedata
+
 #
 # Map the first number system digit to the parity encodings for the
 # following fields, in order:
@@ -62,3 +64,41 @@ def get_right_encoded(digit):
         raise Exception("Invalid digit '%s'" % digit)
     else:
         return encoding_table[digit][2]
+
+
+#
+# Start, centre and end guard bars
+#
+GUARDS = ("101", "01010", "101")
+
+#
+# Precompiled tables for batch encoding, derived from the tables above.
+# Patterns are ASCII "0"/"1" bytes so whole codes can be joined in one go.
+#
+# left_patterns[first digit][position][digit] - the six left hand digits,
+# with the parity for each position already applied
+# right_patterns[digit] - the six right hand digits
+#
+left_patterns = tuple(
+    tuple(tuple(encoding_table[digit][1 - parity].encode("ascii")
+                for digit in range(10))
+          for parity in parity_table[first])
+    for first in range(10))
+
+right_patterns = tuple(encoding_table[digit][2].encode("ascii")
+                       for digit in range(10))
+
+guard_patterns = tuple(guard.encode("ascii") for guard in GUARDS)
+
+# maps ASCII digits to their values for bytes.translate
+digit_values = bytes.maketrans(b"0123456789", bytes(range(10)))
+
+
+def normalize_code(code):
+    """Return code with Unicode decimal digits, such as the full width
+    digits an IME types, replaced by ASCII digits. Other characters are
+    kept, so that validation still rejects them."""
+    if code.isascii():
+        return code
+    return "".join(str(unicodedata.decimal(char)) if char.isdecimal() else char
+                   for char in code)
@@ -0,0 +1,153 @@
+"""Font and glyph caches shared by the renderers
+
+Loading a TrueType font and laying out text are among the most
+expensive steps of rendering a label, so both are done once per
+(font path, size) for the whole process:
+
+>>> font = get_font("arial.ttf", 20)
+>>> atlas = get_glyph_atlas("arial.ttf", 20)
+>>> atlas.draw_char(img, (12, 80), "7")
+>>> get_text_bitmap(font, "NO: A1234").draw(img, (40, 5))
+>>> get_glyph_advances(font).text_length("NO: A1234")
+110.0
+"""
+
+import math
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+DEFAULT_FONT = "arial.ttf"
+
+# number of (path, size) entries kept before the least recently used
+# font or atlas is dropped
+FONT_CACHE_SIZE = 32
+
+# number of rasterized lines of text, such as style code headers, kept
+TEXT_CACHE_SIZE = 1024
+
+DIGITS = "0123456789"
+
+
+def rasterize_text(font, text, frac_x=0.0, frac_y=0.0):
+    """Draw text onto a blank mask as ImageDraw.text would at a position
+    with the given fractional parts, and crop it to its ink. Returns
+    (mask, dx, dy) with the offset of the mask from the position, or
+    None if the text leaves no ink."""
+    # room around the origin for glyphs reaching left of or above it
+    pad = int(math.ceil(getattr(font, "size", 0))) + 2
+    right, bottom = font.getbbox(text)[2:]
+    mask = Image.new("L", (max(right, 0) + 2 * pad,
+                           max(bottom, 0) + 2 * pad), 0)
+    ImageDraw.Draw(mask).text((pad + frac_x, pad + frac_y), text,
+                              font=font, fill=255)
+    box = mask.getbbox()
+    if box is None:
+        return None
+    return mask.crop(box), box[0] - pad, box[1] - pad
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(path, size):
+    """Return the TrueType font at path in the given size, loading it
+    only on first use. Load errors are not cached."""
+    return ImageFont.truetype(path, size)
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_glyph_atlas(path, size):
+    """Return the GlyphAtlas for the font at path in the given size"""
+    return GlyphAtlas(get_font(path, size))
+
+
+class GlyphAtlas:
+    """Rasterized glyph masks for a single font, blitted onto images
+    instead of calling ImageDraw.text for every character.
+
+    Glyphs are rendered exactly as ImageDraw.text renders them,
+    including the sub-pixel part of the start position, so drawing
+    through the atlas gives identical pixels. The digits are rasterized
+    up front; any other character or sub-pixel offset on first use."""
+
+    def __init__(self, font, chars=DIGITS):
+        self.font = font
+        self.glyphs = {}
+        for char in chars:
+            self.get_glyph(char)
+
+    def get_glyph(self, char, frac_x=0.0, frac_y=0.0):
+        """Return (mask, dx, dy) for char drawn at a position with the
+        given fractional parts, or None if it leaves no ink"""
+        key = (char, frac_x, frac_y)
+        try:
+            return self.glyphs[key]
+        except KeyError:
+            glyph = self.glyphs[key] = rasterize_text(self.font, char,
+                                                      frac_x, frac_y)
+            return glyph
+
+    def draw_char(self, img, xy, char, ink=0):
+        """Draw a single character onto img with its top left at xy,
+        as ImageDraw.Draw(img).text(xy, char, font=font, fill=ink)"""
+        x, y = xy
+        if x < 0 or y < 0:
+            # keep ImageDraw's rounding for negative positions
+            ImageDraw.Draw(img).text(xy, char, font=self.font, fill=ink)
+            return
+        glyph = self.get_glyph(char, x - int(x), y - int(y))
+        if glyph is not None:
+            mask, dx, dy = glyph
+            img.paste(ink, (int(x) + dx, int(y) + dy), mask)
+
+
+class TextBitmap:
+    """A line of text rasterized once, with its size as measured by
+    font.getbbox"""
+
+    __slots__ = ("glyph", "width", "height")
+
+    def __init__(self, font, text):
+        left, top, right, bottom = font.getbbox(text)
+        self.width = right - left
+        self.height = bottom - top
+        self.glyph = rasterize_text(font, text)
+
+    def draw(self, img, xy, ink=0):
+        """Draw the text onto img with its top left at the integer
+        position xy, as ImageDraw.Draw(img).text(xy, text, fill=ink)"""
+        if self.glyph is not None:
+            mask, dx, dy = self.glyph
+            img.paste(ink, (xy[0] + dx, xy[1] + dy), mask)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def get_text_bitmap(font, text):
+    """Return the TextBitmap of text in font, rasterizing it on first use"""
+    return TextBitmap(font, text)
+
+
+class GlyphAdvances:
+    """Advance widths of single characters in a font, each measured once,
+    for sizing text without laying it out"""
+
+    def __init__(self, font):
+        self.font = font
+        self.advances = {}
+
+    def text_length(self, text):
+        """Return the advance width of text in pixels"""
+        advances = self.advances
+        total = 0.0
+        for char in text:
+            try:
+                total += advances[char]
+            except KeyError:
+                advance = advances[char] = self.font.getlength(char)
+                total += advance
+        return total
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_glyph_advances(font):
+    """Return the GlyphAdvances table of font"""
+    return GlyphAdvances(font)
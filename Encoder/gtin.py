@@ -0,0 +1,85 @@
+"""Batch check digit calculation and validation for GTIN codes
+
+Whole columns of codes are handled at once with NumPy array operations:
+
+>>> result = validate_gtins(["4006381333931", "96385074", "12345"])
+>>> result.valid
+array([ True,  True, False])
+
+GTIN-8, GTIN-12 (UPC-A), GTIN-13 (EAN-13) and GTIN-14 are accepted. Each
+code must include its check digit as the last character.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+# every GTIN is checked as a zero padded GTIN-14; leading zeros do not
+# change the weighted sum
+_width = 14
+
+# Modulo-10 weights for the 13 data digits of a GTIN-14. Counting from
+# the check digit leftwards, the digits are weighted 3, 1, 3, 1, ...
+_weights = np.array([3, 1] * 6 + [3], dtype=np.int64)
+
+GTINResult = namedtuple("GTINResult", "check_digits valid")
+GTINResult.__doc__ = """Result of validate_gtins, one row per input code
+
+check_digits - the calculated check digit, -1 where it cannot be
+               calculated (bad length or non-digit characters)
+valid        - True where the code is well formed and its last digit
+               equals the calculated check digit"""
+
+
+def _as_codes(codes):
+    """Return codes as a flat, whitespace stripped unicode array"""
+    if not hasattr(codes, "__len__"):
+        codes = list(codes)
+    codes = np.asarray(codes)
+    if codes.dtype.kind != "U":
+        codes = codes.astype(str)
+    return np.char.strip(codes.ravel())
+
+
+def _as_digits(codes):
+    """Return (digits, well_formed) for a unicode array of codes.
+    digits is an (n, 14) int array of the zero padded codes"""
+    if not codes.size:
+        return np.zeros((0, _width), dtype=np.int64), np.zeros(0, dtype=bool)
+    lengths = np.char.str_len(codes)
+
+    padded = np.char.rjust(codes, _width, "0").astype("U%d" % _width)
+    digits = padded.view(np.uint32).reshape(-1, _width).astype(np.int64)
+    digits -= ord("0")
+
+    well_formed = np.isin(lengths, GTIN_LENGTHS)
+    well_formed &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+    return digits, well_formed
+
+
+def _check_digits(digits, well_formed):
+    """Modulo-10 check digits for the first 13 columns of digits,
+    -1 for rows which are not well formed"""
+    result = -(digits[:, :-1] @ _weights) % 10
+    result[~well_formed] = -1
+    return result
+
+
+def check_digits(codes):
+    """Calculate check digits for an array or iterable of codes given
+    without one, i.e. 7, 11, 12 or 13 digits long. Returns an int array,
+    -1 where a code is malformed."""
+    digits, well_formed = _as_digits(np.char.add(_as_codes(codes), "0"))
+    return _check_digits(digits, well_formed)
+
+
+def validate_gtins(codes):
+    """Validate an array or iterable of GTIN codes, check digit included.
+    Returns a GTINResult of the calculated check digits and the per-row
+    validity mask; malformed rows are reported there instead of raising."""
+    digits, well_formed = _as_digits(_as_codes(codes))
+    calculated = _check_digits(digits, well_formed)
+    valid = well_formed & (calculated == digits[:, -1])
+    return GTINResult(calculated, valid)
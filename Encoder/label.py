@@ -0,0 +1,303 @@
+"""Rendering of complete labels: the barcode plus its style code header
+
+>>> image = render_label("690123456789", "A1234", bar_width=2,
+...                      fontSize=20, headerFontSize=22.5)
+
+Results are kept in the shared render cache, keyed by the full code,
+the render parameters and the header, so the returned image must be
+treated as read only. enable_disk_cache keeps them on disk as well, for
+later sessions.
+
+A LabelSpec describes a label without holding its image, for keeping
+many labels around and rendering them when needed:
+
+>>> spec = LabelSpec("690123456789", "A1234", quantity=20)
+>>> image = spec.render()
+"""
+
+import math
+from functools import lru_cache
+
+import PIL
+from PIL import Image, ImageFont
+
+from . import EAN13Encoder
+from .cache import render_cache
+from .diskcache import DEFAULT_DISK_BYTES, DiskCache
+from .patterns import encode_pattern
+from .renderer import digit_step, scaled_digit_step
+from .fonts import (DEFAULT_FONT, FONT_CACHE_SIZE, TEXT_CACHE_SIZE,
+                    get_font, get_glyph_advances, get_text_bitmap)
+
+
+# label sizes to choose from, smallest first: bar width in pixels
+# (picWidth), header font size (frontSize), digit font size
+# (numberFontSize) and digit spacing
+LABEL_SIZES = (
+    {'picWidth': 2, 'frontSize': 22.5, 'numberFontSize': 20, 'spacing': 1.0},
+    {'picWidth': 3, 'frontSize': 29, 'numberFontSize': 30, 'spacing': 1.1},
+    {'picWidth': 4, 'frontSize': 35, 'numberFontSize': 40, 'spacing': 1.2},
+)
+
+# bump whenever a change to the renderers alters their pixels, so that
+# labels cached on disk by an older version are not used
+RENDER_VERSION = 2
+
+# modules across a barcode image: 95 for the symbol, 9 of quiet zone
+# on either side
+IMAGE_MODULES = 95 + 2 * 9
+
+
+def calculate_barcode_width(style_code):
+    """根据文本实际渲染宽度设置条形码宽度"""
+    if not style_code:
+        return dict(LABEL_SIZES[0])  # 默认宽度
+    return dict(fit_label_size(header_text(style_code)))
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def fit_label_size(text):
+    """Return the smallest of LABEL_SIZES whose barcode is at least as
+    wide as the header text, measured with the header font's glyph
+    advances. Text too wide for every size gets the largest size with
+    its header font scaled down to fit. Results are kept per text."""
+    for size in LABEL_SIZES:
+        width = get_glyph_advances(_header_font(size['frontSize'])).text_length(text)
+        if width <= size['picWidth'] * IMAGE_MODULES:
+            return size
+
+    # 款号过长：用最大尺寸并按比例缩小表头字号（取 0.5 的整数倍）
+    size = dict(LABEL_SIZES[-1])
+    limit = size['picWidth'] * IMAGE_MODULES
+    scaled = size['frontSize'] * limit / width
+    size['frontSize'] = max(math.floor(scaled * 2) / 2, 1)
+    # 字形宽度不完全随字号线性变化，仍放不下时再逐步缩小
+    while (size['frontSize'] > 1 and
+           get_glyph_advances(_header_font(size['frontSize'])).text_length(text) > limit):
+        size['frontSize'] -= 0.5
+    return size
+
+
+def header_text(style_code):
+    """Return the header line printed above a label's barcode"""
+    return f"NO: {style_code}"
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def _header_font(font_size):
+    """Font of the style code header, falling back to PIL's default"""
+    # 尝试加载系统字体，否则用默认
+    try:
+        return get_font(DEFAULT_FONT, font_size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+def add_style_header(barcode_image, style_code, font_size):
+    """Return a new grayscale image with "NO: <style_code>" centred above
+    barcode_image. The text is rasterized and measured once per style
+    code and font size and stamped into the final image, the only one
+    allocated."""
+    text = get_text_bitmap(_header_font(font_size), header_text(style_code))
+
+    # 新建一个高出文字高度的白色画布，把原条码图粘贴到下面
+    image = Image.new("L", (barcode_image.width,
+                            barcode_image.height + text.height + 8), 255)
+    image.paste(barcode_image, (0, text.height + 10))
+    text.draw(image, ((barcode_image.width - text.width)//2, 5))
+    return image
+
+
+def render_label(code, style_code="", bar_width=3, fontSize=20, spacing=1.0,
+                 headerFontSize=22.5, cache=render_cache, digitStep=None):
+    """Render the barcode for a 12 or 13 digit code, with the style code
+    header above it when style_code is set. digitStep overrides the
+    default distance between the digits. Pass cache=None to bypass the
+    render cache."""
+    encoder = EAN13Encoder(code)
+
+    def render():
+        barcode_image = encoder.get_pilimage(bar_width=bar_width,
+                                             fontSize=fontSize,
+                                             spacing=spacing,
+                                             digitStep=digitStep)
+        if style_code:
+            return add_style_header(barcode_image, style_code, headerFontSize)
+        return barcode_image
+
+    if cache is None:
+        return render()
+    key = label_key(encoder.full_code, style_code, bar_width, fontSize,
+                    spacing, headerFontSize, digitStep)
+    return cache.get_or_render(key, render)
+
+
+def label_key(full_code, style_code, bar_width, fontSize, spacing,
+              headerFontSize, digitStep=None):
+    """Return the render cache key for a label"""
+    header = (style_code, headerFontSize) if style_code else None
+    return (full_code, bar_width, fontSize, spacing,
+            digitStep or digit_step(bar_width), header)
+
+
+def render_sized_label(code, style_code="", cache=render_cache):
+    """Render a label sized for its style code by calculate_barcode_width,
+    as the barcode generator window does"""
+    params = calculate_barcode_width(style_code)
+    return render_label(code, style_code,
+                        bar_width=params['picWidth'],
+                        fontSize=params['numberFontSize'],
+                        spacing=params['spacing'],
+                        headerFontSize=params['frontSize'],
+                        cache=cache)
+
+
+def label_size(style_code, params):
+    """Return the (width, height) in pixels of the label render_label
+    draws with the calculate_barcode_width style params, without
+    rendering it"""
+    width = params['picWidth'] * IMAGE_MODULES
+    height = width // 2
+    if style_code:
+        top, bottom = _header_font(params['frontSize']).getbbox(
+            header_text(style_code))[1::2]
+        height += bottom - top + 8
+    return width, height
+
+
+def fit_label_params(style_code, box_width, box_height):
+    """Return the calculate_barcode_width params for style_code with the
+    bar width changed to the largest whole number of pixels whose label
+    fits a box_width x box_height pixel box, and the font sizes scaled
+    with it. The label keeps its proportions but can be printed at that
+    box size without resampling. The bar width is at least 1 even if the
+    label does not fit."""
+    params = calculate_barcode_width(style_code)
+    bar_width = max(box_width // IMAGE_MODULES, 1)
+    while True:
+        scale = bar_width / params['picWidth']
+        fitted = dict(params, picWidth=bar_width,
+                      frontSize=math.floor(params['frontSize'] * scale * 2) / 2,
+                      numberFontSize=math.floor(params['numberFontSize'] * scale * 2) / 2)
+        if bar_width == 1 or label_size(style_code, fitted)[1] <= box_height:
+            return fitted
+        bar_width -= 1
+
+
+def render_fitted_label(code, style_code, box_width, box_height,
+                        cache=render_cache):
+    """Render a label sized by fit_label_params for a box_width x
+    box_height pixel box. The digits keep their spacing relative to the
+    bars at any bar width (scaled_digit_step)."""
+    params = fit_label_params(style_code, box_width, box_height)
+    return render_label(code, style_code,
+                        bar_width=params['picWidth'],
+                        fontSize=params['numberFontSize'],
+                        spacing=params['spacing'],
+                        headerFontSize=params['frontSize'],
+                        cache=cache,
+                        digitStep=scaled_digit_step(params['picWidth']))
+
+
+def enable_disk_cache(directory, max_bytes=DEFAULT_DISK_BYTES):
+    """Keep rendered labels in directory as well as in memory, so later
+    sessions and other processes find them without rendering. Cached
+    files are tied to RENDER_VERSION and the Pillow version, which
+    decides how text is rasterized."""
+    render_cache.disk = DiskCache(
+        directory, max_bytes=max_bytes,
+        version="%d/%s" % (RENDER_VERSION, PIL.__version__))
+    return render_cache.disk
+
+
+def disable_disk_cache():
+    """Stop using the disk cache; files already written are kept"""
+    render_cache.disk = None
+
+
+def sized_label_key(code, style_code=""):
+    """Return the render cache key render_sized_label uses"""
+    params = calculate_barcode_width(style_code)
+    return label_key(EAN13Encoder(code).full_code, style_code,
+                     params['picWidth'], params['numberFontSize'],
+                     params['spacing'], params['frontSize'])
+
+
+class LabelSpec:
+    """A label to print, without its image: the code as entered with its
+    95 module bar pattern, the style code, the quantity and the render
+    sizes chosen by calculate_barcode_width. A few hundred bytes each, so
+    a session can hold thousands; images are rendered on demand and
+    shared through the bounded render cache."""
+
+    __slots__ = ("barcode_code", "style_code", "pattern", "quantity",
+                 "item_id", "bar_width", "font_size", "spacing",
+                 "header_font_size")
+
+    def __init__(self, barcode_code, style_code="", quantity=1, item_id=None):
+        params = calculate_barcode_width(style_code)
+        self.barcode_code = barcode_code
+        self.style_code = style_code
+        self.pattern = encode_pattern(barcode_code)
+        self.quantity = quantity
+        self.item_id = item_id
+        self.bar_width = params['picWidth']
+        self.font_size = params['numberFontSize']
+        self.spacing = params['spacing']
+        self.header_font_size = params['frontSize']
+
+    def __repr__(self):
+        return "LabelSpec(%r, %r, quantity=%r)" % (
+            self.barcode_code, self.style_code, self.quantity)
+
+    def key(self):
+        """Return the render cache key of the label, the same as
+        sized_label_key gives"""
+        return label_key(self.pattern.full_code, self.style_code,
+                         self.bar_width, self.font_size, self.spacing,
+                         self.header_font_size)
+
+    def render(self, cache=render_cache):
+        """Render the label from its bar pattern, as render_sized_label
+        would. Pass cache=None to bypass the render cache."""
+        def render():
+            barcode_image = self.pattern.get_renderer().get_pilimage(
+                self.bar_width, fontSize=self.font_size, spacing=self.spacing)
+            if self.style_code:
+                return add_style_header(barcode_image, self.style_code,
+                                        self.header_font_size)
+            return barcode_image
+
+        if cache is None:
+            return render()
+        return cache.get_or_render(self.key(), render)
+
+    def as_label(self):
+        """Return the label dict used by sheet and batch, without an
+        image"""
+        return {'style_code': self.style_code,
+                'barcode_code': self.barcode_code,
+                'quantity': self.quantity,
+                'itemID': self.item_id}
+
+
+def draw_label(canvas, x, y, width, height, code, style_code="", bar_width=3,
+               fontSize=20, spacing=1.0, headerFontSize=22.5):
+    """Draw the label for code as vector shapes onto a reportlab canvas,
+    fitted into the box at (x, y) of width x height points"""
+    header = header_text(style_code) if style_code else None
+    EAN13Encoder(code).draw(canvas, x, y, width, height, bar_width=bar_width,
+                            fontSize=fontSize, spacing=spacing, header=header,
+                            headerFontSize=headerFontSize)
+
+
+def label_pdf_content(width, height, code, style_code="", bar_width=3,
+                      fontSize=20, spacing=1.0, headerFontSize=22.5,
+                      font_name="Helv"):
+    """Return PDF content stream operators drawing the label for code as
+    vector shapes, fitted into a box of width x height points"""
+    header = header_text(style_code) if style_code else None
+    return EAN13Encoder(code).get_pdf_content(
+        width, height, bar_width=bar_width, fontSize=fontSize,
+        spacing=spacing, header=header, headerFontSize=headerFontSize,
+        font_name=font_name)
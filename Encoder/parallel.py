@@ -0,0 +1,88 @@
+"""Parallel rendering of large label jobs
+
+Unique labels are fanned out to a pool of worker processes (or threads)
+and the images are gathered back in input order:
+
+>>> with make_executor(workers=8) as executor:
+...     images = render_many(labels, executor, chunksize=32)
+
+Labels are dicts with 'barcode_code' and 'style_code', sized by
+calculate_barcode_width as in the GUI. Rendered images are also stored
+in the shared render cache of the calling process.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+from .cache import render_cache
+from .label import render_sized_label, sized_label_key
+
+# labels handed to a worker process per task
+DEFAULT_CHUNKSIZE = 16
+
+# labels render_stream reads ahead and renders together
+DEFAULT_WINDOW = 1024
+
+
+def make_executor(workers=None, threads=False, start_method=None):
+    """Return an executor for render_many: a process pool by default,
+    or a thread pool. workers defaults to the number of CPUs.
+    start_method picks how worker processes are started, such as
+    "spawn" for callers with threads of their own, which must not be
+    forked; None uses the platform default."""
+    if threads:
+        return ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+    context = multiprocessing.get_context(start_method) if start_method else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def _render(key):
+    """Worker entry point: render one (code, style_code) label"""
+    code, style_code = key
+    return render_sized_label(code, style_code, cache=None)
+
+
+def render_many(labels, executor, chunksize=DEFAULT_CHUNKSIZE):
+    """Render labels with executor and return their images in input
+    order. Each distinct (code, style_code) is rendered once; labels
+    already in the render cache are not rendered at all."""
+    keys = [(label['barcode_code'], label.get('style_code', ''))
+            for label in labels]
+
+    images = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        cache_key = sized_label_key(*key)
+        image = render_cache.get(cache_key)
+        if image is None:
+            missing.append((key, cache_key))
+        else:
+            images[key] = image
+
+    if missing:
+        # thread pools ignore chunksize
+        results = executor.map(_render, [key for key, _ in missing],
+                               chunksize=chunksize)
+        for (key, cache_key), image in zip(missing, results):
+            render_cache.put(cache_key, image)
+            images[key] = image
+
+    return [images[key] for key in keys]
+
+
+def render_stream(labels, executor, chunksize=DEFAULT_CHUNKSIZE,
+                  window=DEFAULT_WINDOW):
+    """Render an iterable of labels in windows of window labels, yielding
+    each label in input order with its 'barcode_image' filled in. Only
+    one window is held in memory at a time."""
+    labels = iter(labels)
+    while True:
+        batch = list(islice(labels, window))
+        if not batch:
+            return
+        for label, image in zip(batch, render_many(batch, executor,
+                                                   chunksize=chunksize)):
+            label['barcode_image'] = image
+            yield label
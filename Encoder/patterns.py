@@ -0,0 +1,73 @@
+"""Batch encoding of EAN-13 codes into compact bar patterns"""
+
+from .encoding import (GUARDS, digit_values, guard_patterns, left_patterns,
+                       normalize_code, right_patterns)
+from .renderer import EAN13Renderer
+
+START, CENTRE, END = guard_patterns
+
+
+class EAN13Pattern:
+    """Compact result of encoding one code: the full 13 digit code and
+    its 95 module bar pattern, guards included, as ASCII "0"/"1" bytes"""
+
+    __slots__ = ("full_code", "modules")
+
+    def __init__(self, full_code, modules):
+        self.full_code = full_code
+        self.modules = modules
+
+    def __repr__(self):
+        return "EAN13Pattern(%r)" % self.full_code
+
+    @property
+    def left_bars(self):
+        """the left hand data bars, as EAN13Encoder.left_bars"""
+        return self.modules[3:45].decode("ascii")
+
+    @property
+    def right_bars(self):
+        """the right hand data bars, as EAN13Encoder.right_bars"""
+        return self.modules[50:92].decode("ascii")
+
+    def get_renderer(self, engine=None):
+        """Return an EAN13Renderer for this pattern"""
+        return EAN13Renderer(self.full_code, self.left_bars,
+                             self.right_bars, GUARDS, engine=engine)
+
+
+def encode_pattern(code):
+    """Encode a single 12 or 13 digit code into an EAN13Pattern.
+    As with EAN13Encoder, a 13th digit is dropped and the check
+    digit calculated afresh, and any Unicode decimal digits are read as
+    their ASCII equivalents."""
+
+    raw = normalize_code(code).encode("ascii", "replace")
+    if len(raw) == 13:
+        # cut of check digit
+        raw = raw[:-1]
+    if len(raw) != 12 or not raw.isdigit():
+        raise Exception("code must be 12 digits long")
+
+    digits = raw.translate(digit_values)
+    total = sum(digits[1::2]) * 3 + sum(digits[0::2])
+    check_digit = -total % 10
+
+    left = left_patterns[digits[0]]
+    modules = b"".join((
+        START,
+        left[0][digits[1]], left[1][digits[2]], left[2][digits[3]],
+        left[3][digits[4]], left[4][digits[5]], left[5][digits[6]],
+        CENTRE,
+        right_patterns[digits[7]], right_patterns[digits[8]],
+        right_patterns[digits[9]], right_patterns[digits[10]],
+        right_patterns[digits[11]], right_patterns[check_digit],
+        END))
+
+    return EAN13Pattern(raw.decode("ascii") + str(check_digit), modules)
+
+
+def encode_many(codes):
+    """Encode an iterable of 12 or 13 digit codes, returning a list of
+    EAN13Pattern objects in the same order"""
+    return [encode_pattern(code) for code in codes]
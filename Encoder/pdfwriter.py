@@ -0,0 +1,168 @@
+"""Minimal PDF writer that streams objects straight to a file
+
+reportlab keeps every page and image of a document in memory until it
+is saved. This writer instead puts each object on disk as soon as it is
+complete and only remembers its byte offset, so documents of any length
+are written with a flat memory profile. It supports just what label
+sheets need: image and form XObjects, the standard Helvetica font and
+page content streams.
+
+>>> with PDFStreamWriter("out.pdf") as pdf:
+...     image = pdf.add_image(pil_img)
+...     pdf.add_page(595, 842, b"q 90 0 0 45 10 10 cm /I Do Q",
+...                  xobjects={"I": image})
+"""
+
+import os
+import zlib
+
+# PIL modes written as-is: colour space and bits per component
+_image_modes = {
+    "1": ("DeviceGray", 1),
+    "L": ("DeviceGray", 8),
+    "RGB": ("DeviceRGB", 8),
+}
+
+
+def fmt_num(value):
+    """Format a number compactly for PDF content streams"""
+    if value == int(value):
+        return "%d" % value
+    return ("%.4f" % value).rstrip("0").rstrip(".")
+
+
+def pdf_string(text):
+    """Return text as a PDF literal string in WinAnsi encoding"""
+    data = text.encode("cp1252", "replace")
+    data = (data.replace(b"\\", b"\\\\")
+                .replace(b"(", b"\\(")
+                .replace(b")", b"\\)"))
+    return b"(" + data + b")"
+
+
+class PDFStreamWriter:
+    """Writes a PDF document object by object"""
+
+    def __init__(self, file_path, compress_level=6):
+        self.file_path = file_path
+        self._file = open(file_path, "wb")
+        self._offsets = {}
+        self._next_number = 3  # 1 and 2 are the catalog and page tree
+        self._pages = []
+        self._font = None
+        self.compress_level = compress_level
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def _write(self, data):
+        self._file.write(data)
+
+    def _begin_object(self, number=None):
+        if number is None:
+            number = self._next_number
+            self._next_number += 1
+        self._offsets[number] = self._file.tell()
+        self._write(b"%d 0 obj\n" % number)
+        return number
+
+    def add_object(self, body, number=None):
+        """Write a non-stream object, returning its object number"""
+        number = self._begin_object(number)
+        self._write(body + b"\nendobj\n")
+        return number
+
+    def add_stream(self, dictionary, data, compress=True):
+        """Write a stream object with the given dictionary entries,
+        returning its object number"""
+        if compress:
+            data = zlib.compress(data, self.compress_level)
+            dictionary = dictionary + b" /Filter /FlateDecode"
+        number = self._begin_object()
+        self._write(b"<< %s /Length %d >>\nstream\n" % (dictionary, len(data)))
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+        return number
+
+    def add_image(self, image):
+        """Write a PIL image as an image XObject"""
+        if image.mode not in _image_modes:
+            image = image.convert("RGB")
+        colour_space, bits = _image_modes[image.mode]
+        return self.add_stream(
+            b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace /%s /BitsPerComponent %d"
+            % (image.width, image.height, colour_space.encode(), bits),
+            image.tobytes())
+
+    def get_font(self):
+        """Return the object number of the standard Helvetica font"""
+        if self._font is None:
+            self._font = self.add_object(
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                b"/Encoding /WinAnsiEncoding >>")
+        return self._font
+
+    def _resources(self, xobjects=None, fonts=None):
+        entries = []
+        if xobjects:
+            entries.append(b"/XObject << %s >>" % b" ".join(
+                b"/%s %d 0 R" % (name.encode(), number)
+                for name, number in xobjects.items()))
+        if fonts:
+            entries.append(b"/Font << %s >>" % b" ".join(
+                b"/%s %d 0 R" % (name.encode(), number)
+                for name, number in fonts.items()))
+        return b"<< %s >>" % b" ".join(entries)
+
+    def add_form(self, width, height, content, xobjects=None, fonts=None):
+        """Write a form XObject with the given content stream"""
+        return self.add_stream(
+            b"/Type /XObject /Subtype /Form /BBox [0 0 %s %s] /Resources %s"
+            % (fmt_num(width).encode(), fmt_num(height).encode(),
+               self._resources(xobjects, fonts)),
+            content)
+
+    def add_page(self, width, height, content, xobjects=None, fonts=None):
+        """Write a page with the given content stream"""
+        contents = self.add_stream(b"", content)
+        self._pages.append(self.add_object(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %s %s] "
+            b"/Resources %s /Contents %d 0 R >>"
+            % (fmt_num(width).encode(), fmt_num(height).encode(),
+               self._resources(xobjects, fonts), contents)))
+
+    @property
+    def page_count(self):
+        return len(self._pages)
+
+    def close(self):
+        """Write the page tree, cross reference table and trailer"""
+        self.add_object(b"<< /Type /Catalog /Pages 2 0 R >>", number=1)
+        self.add_object(b"<< /Type /Pages /Kids [%s] /Count %d >>"
+                        % (b" ".join(b"%d 0 R" % page for page in self._pages),
+                           len(self._pages)), number=2)
+
+        xref = self._file.tell()
+        count = self._next_number
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % count)
+        for number in range(1, count):
+            self._write(b"%010d 00000 n \n" % self._offsets[number])
+        self._write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (count, xref))
+        self._file.close()
+
+    def discard(self):
+        """Close and delete an unfinished file, which no reader could open"""
+        self._file.close()
+        try:
+            os.remove(self.file_path)
+        except OSError:
+            pass
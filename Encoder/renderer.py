@@ -1,11 +1,14 @@
 """Rendering code for EAN-13 barcode"""
 
+import re
 from functools import reduce
 from io import BytesIO
 
 from PIL import Image, ImageFont, ImageDraw
 
 from pystrich.fonts import get_font
+
+from .fonts import DEFAULT_FONT, get_glyph_atlas
 # maps bar width against font size
 font_sizes = {
     1: 8,
@@ -15,6 +18,73 @@ font_sizes = {
 }
 
 
+def digit_step(bar_width):
+    """Return the default horizontal distance, in pixels, between the
+    digits under the bars for a bar width: font_sizes, or 24 for wider
+    bars than it covers. Shared by the raster and vector renderers so
+    that both place the digits alike."""
+    return font_sizes.get(bar_width, 24)
+
+
+def scaled_digit_step(bar_width):
+    """Return a digit step keeping the 6 pixels per module of font_sizes
+    for wider bars too, for labels rendered at printer resolution where
+    the fixed 24 would crowd the digits under the bars. Pass it to
+    get_pilimage as digitStep."""
+    return font_sizes.get(bar_width, 6 * bar_width)
+
+# Raster engines understood by EAN13Renderer:
+# "rect"     - draws each run of black modules as one filled rectangle
+# "putpixel" - the original pixel-by-pixel writer, kept for comparison
+RASTER_ENGINES = ("rect", "putpixel")
+DEFAULT_ENGINE = "rect"
+
+# Output modes of rendered images:
+# "L" - 8-bit grayscale, keeping the anti-aliased edges of the digits
+# "1" - 1-bit black and white, an eighth of the memory and much
+#       smaller PNG files
+OUTPUT_MODES = ("L", "1")
+DEFAULT_MODE = "L"
+
+# zlib level PNG files are written with, 0 (fastest) to 9 (smallest)
+PNG_COMPRESS_LEVEL = 6
+
+# nominal EAN-13 module width (X-dimension) at 100% magnification, mm
+NOMINAL_MODULE_MM = 0.33
+
+# a run of adjacent black modules
+_bar_run = re.compile("1+")
+
+
+def convert_mode(img, mode):
+    """Return img in the given output mode. 1-bit images are thresholded
+    at mid grey rather than dithered, so bars keep their exact edges."""
+    if mode not in OUTPUT_MODES:
+        raise Exception("Invalid output mode '%s'" % mode)
+    if img.mode == mode:
+        return img
+    if mode == "1":
+        return img.convert("1", dither=Image.NONE)
+    return img.convert(mode)
+
+
+def write_png(img, fp, mode=DEFAULT_MODE, compress_level=PNG_COMPRESS_LEVEL,
+              dpi=None):
+    """Write img out as PNG to fp, a file name or file object, in the
+    given output mode. dpi is a resolution, or an (x, y) pair, stored in
+    the file for printing; no resolution is stored when it is None."""
+    params = {"compress_level": compress_level}
+    if dpi:
+        params["dpi"] = dpi if isinstance(dpi, tuple) else (dpi, dpi)
+    convert_mode(img, mode).save(fp, "PNG", **params)
+
+
+def module_dpi(bar_width, module_mm=NOMINAL_MODULE_MM):
+    """Return the resolution to store with an image rendered at bar_width
+    pixels per module so that each module prints module_mm wide"""
+    return round(bar_width * 25.4 / module_mm)
+
+
 class EAN13Renderer:
     """Rendering class - given the code and corresponding
     bar encodings and guard bars,
@@ -23,13 +93,29 @@ class EAN13Renderer:
     width = None
     height = None
 
-    def __init__(self, code, left_bars, right_bars, guards):
+    def __init__(self, code, left_bars, right_bars, guards, engine=None):
         self.code = code
         self.left_bars = left_bars
         self.right_bars = right_bars
         self.guards = guards
+        self.engine = engine or DEFAULT_ENGINE
+        if self.engine not in RASTER_ENGINES:
+            raise Exception("Invalid raster engine '%s'" % self.engine)
+
+    def get_segments(self):
+        """Return the bar segments in drawing order as
+        (bars, full) pairs, full being set for the guard bars"""
+        return ((self.guards[0], True),
+                (self.left_bars, False),
+                (self.guards[1], True),
+                (self.right_bars, False),
+                (self.guards[2], True))
+
+    def get_pilimage(self, bar_width,fontSize=20,spacing=1.0,mode=DEFAULT_MODE,
+                     digitStep=None):
+        if mode not in OUTPUT_MODES:
+            raise Exception("Invalid output mode '%s'" % mode)
 
-    def get_pilimage(self, bar_width,fontSize=20,spacing=1.0):
         def sum_len(total, item):
             """add the length of a given item to the total"""
             return total + len(item)
@@ -68,23 +154,47 @@ class EAN13Renderer:
                     self.write_bar(int(bar), full)
 
         # Draw the bars
-        writer = BarWriter(img)
-        writer.write_bars(self.guards[0], full=True)
-        writer.write_bars(self.left_bars)
-        writer.write_bars(self.guards[1], full=True)
-        writer.write_bars(self.right_bars)
-        writer.write_bars(self.guards[2], full=True)
+        if self.engine == "putpixel":
+            writer = BarWriter(img)
+            for bars, full in self.get_segments():
+                writer.write_bars(bars, full=full)
+        else:
+            # one rectangle per run of black modules, with the same
+            # inclusive pixel bounds the putpixel loop would cover
+            draw = ImageDraw.Draw(img)
+            symbol_top = quiet_width // 2
+            current_x = quiet_width
+            for bars, full in self.get_segments():
+                bottom = int(image_height * (full and 0.9 or 0.8)) - 1
+                if bottom >= symbol_top:
+                    for run in _bar_run.finditer(bars):
+                        draw.rectangle(
+                            (current_x + run.start() * bar_width, symbol_top,
+                             current_x + run.end() * bar_width - 1, bottom),
+                            fill=0)
+                current_x += len(bars) * bar_width
 
         # Draw the text
-        font_size = font_sizes.get(bar_width, 24)
+        font_size = digitStep or digit_step(bar_width)
 
         # font = get_font("courR", font_size)
-        font = ImageFont.truetype("arial.ttf", fontSize)
-        draw = ImageDraw.Draw(img)
+        if self.engine == "putpixel":
+            # original path: load the font and lay out every digit
+            font = ImageFont.truetype(DEFAULT_FONT, fontSize)
+            draw = ImageDraw.Draw(img)
+
+            def draw_digit(xy, digit):
+                draw.text(xy, digit, font=font)
+        else:
+            # blit pre-rasterized digits from the shared glyph atlas
+            atlas = get_glyph_atlas(DEFAULT_FONT, fontSize)
+
+            def draw_digit(xy, digit):
+                atlas.draw_char(img, xy, digit)
 
         # 第一个数字保持不变
-        draw.text((1 * bar_width, int(image_height * 0.785)),
-                  self.code[0], font=font)
+        draw_digit((1 * bar_width, int(image_height * 0.785)),
+                   self.code[0])
 
         # 为第2-7位数字（中间组）设置间距
         digit_spacing = spacing  # 数字间距倍数，大于1会增加间距
@@ -92,30 +202,41 @@ class EAN13Renderer:
         for i in range(1, 7):
             # 计算每个数字的位置，加入额外间距
             pos_x = base_pos + (i-1) * font_size * digit_spacing
-            draw.text((pos_x, int(image_height * 0.785)),
-                      self.code[i], font=font)
+            draw_digit((pos_x, int(image_height * 0.785)),
+                       self.code[i])
 
         # 为第8-13位数字（右侧组）设置间距  
         base_pos = 59 * bar_width
         for i in range(7, 13):
             pos_x = base_pos + (i-7) * font_size * digit_spacing
-            draw.text((pos_x, int(image_height * 0.785)),
-                      self.code[i], font=font)
+            draw_digit((pos_x, int(image_height * 0.785)),
+                       self.code[i])
 
         self.width = image_width
         self.height = image_height
-        return img
+        return convert_mode(img, mode)
 
-    def write_file(self, filename, bar_width, fontSize=20, spacing=1.0):
+    def write_file(self, filename, bar_width, fontSize=20, spacing=1.0,
+                   mode=DEFAULT_MODE, compress_level=PNG_COMPRESS_LEVEL,
+                   dpi=None):
         """Write barcode data out to image file
         filename - the name of the image file
-        bar_width - the desired width of each bar"""
-        img = self.get_pilimage(bar_width, fontSize=fontSize, spacing=spacing)
-        img.save(filename, "PNG")
-
-    def get_imagedata(self, bar_width, fontSize=20, spacing=1.0):
+        bar_width - the desired width of each bar
+        mode - "L" for grayscale or "1" for black and white
+        compress_level - zlib level of the PNG data, 0 to 9
+        dpi - resolution stored in the file, or None"""
+        img = self.get_pilimage(bar_width, fontSize=fontSize, spacing=spacing,
+                                mode=mode)
+        write_png(img, filename, compress_level=compress_level, dpi=dpi,
+                  mode=mode)
+
+    def get_imagedata(self, bar_width, fontSize=20, spacing=1.0,
+                      mode=DEFAULT_MODE, compress_level=PNG_COMPRESS_LEVEL,
+                      dpi=None):
         """Write the matrix out as PNG to a bytestream"""
         buffer = BytesIO()
-        img = self.get_pilimage(bar_width, fontSize=fontSize, spacing=spacing)
-        img.save(buffer, "PNG")
+        img = self.get_pilimage(bar_width, fontSize=fontSize, spacing=spacing,
+                                mode=mode)
+        write_png(img, buffer, compress_level=compress_level, dpi=dpi,
+                  mode=mode)
         return buffer.getvalue()
@@ -0,0 +1,198 @@
+"""A4 label sheets: the grid layout shared by the GUI and batch exports
+
+>>> write_label_sheet("labels.pdf", [
+...     {'style_code': 'A1234', 'barcode_code': '690123456789', 'quantity': 20},
+... ])
+
+Each label is a dict as returned by LabelSpec.as_label(). A
+'barcode_image' entry, when present, is used for raster output instead
+of rendering the label again, except at a printer resolution (below).
+
+Pages are written out as soon as they are full, so labels can be a
+generator over any number of rows.
+
+For a label printer, pass its resolution to render every label at the
+exact pixel size of a cell and embed it unscaled on the printer's pixel
+grid, so nothing is resampled when the page is printed:
+
+>>> write_label_sheet("labels.pdf", labels, dpi=300)
+"""
+
+from collections import OrderedDict
+
+from reportlab.lib.pagesizes import A4
+
+from .label import (calculate_barcode_width, label_pdf_content,
+                    render_fitted_label, render_sized_label)
+from .pdfwriter import PDFStreamWriter, fmt_num
+
+width, height = A4  # A4: 595 x 842 points
+
+# 设置条形码尺寸参数
+barcode_width = 90   # 单个条形码宽度（点）
+barcode_height = 45   # 单个条形码高度（点）
+barcodes_per_row = 7  # 每行放置的条形码数量
+
+# 设置页面边距
+margin_x = 10  # 左右边距（点）
+margin_y = 32  # 上下边距（点）
+
+# 计算行距和列距
+row_spacing = barcode_height + 5  # 行距：条码高 + 文本间隔
+col_spacing = (width - 2 * margin_x) / barcodes_per_row
+max_items_per_page = barcodes_per_row * 16  # 每页最多 16 行
+
+
+def cell_position(index):
+    """Return the lower left corner (x, y) of grid cell index on a page"""
+    current_row, current_col = divmod(index, barcodes_per_row)
+    x = margin_x + current_col * col_spacing
+    y = height - margin_y - (current_row+1) * row_spacing + 20
+    return x, y
+
+
+def snap(value, dpi):
+    """Round a length in points to a whole number of pixels at dpi"""
+    return round(value * dpi / 72) * 72 / dpi
+
+
+class LabelSheetWriter:
+    """Lays labels out on A4 pages, 7 columns by 16 rows, writing each
+    page to the file as soon as it is full. With dpi set, raster labels
+    are rendered to fit a cell at that resolution with a whole number of
+    pixels per module and placed on the printer's pixel grid.
+
+    Labels are rendered just in time when they are first added and each
+    distinct label is stored once as a PDF form that later cells refer
+    to. Nothing but the object numbers of recent forms is kept after a
+    page is written, so memory use stays flat however many labels are
+    added.
+
+    >>> with LabelSheetWriter("labels.pdf") as sheet:
+    ...     for label in labels:
+    ...         sheet.add(label)
+    """
+
+    # forms remembered for reuse; older labels are written again if
+    # they come back
+    max_forms = 4096
+
+    def __init__(self, file_path, vector=False, dpi=None):
+        self.vector = vector
+        self.dpi = dpi
+        self.placed = 0
+        self._pdf = PDFStreamWriter(file_path)
+        self._forms = OrderedDict()
+        self._cells = []
+        self._page_forms = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # 出错时不留下写了一半、无法打开的 PDF
+            self._pdf.discard()
+
+    def _write_form(self, label):
+        """Render label and write it out as a barcode_width x
+        barcode_height form, returning the form's object number"""
+        style_code = label.get('style_code', '')
+        if self.vector:
+            params = calculate_barcode_width(style_code)
+            # 直接绘制条形和文字，无需栅格化和图像压缩
+            content = label_pdf_content(barcode_width, barcode_height,
+                                        label['barcode_code'],
+                                        style_code,
+                                        bar_width=params['picWidth'],
+                                        fontSize=params['numberFontSize'],
+                                        spacing=params['spacing'],
+                                        headerFontSize=params['frontSize'])
+            return self._pdf.add_form(barcode_width, barcode_height, content,
+                                      fonts={"Helv": self._pdf.get_font()})
+
+        if self.dpi:
+            # 按打印机分辨率渲染成格子的像素尺寸，原样放置，不再缩放
+            cell_w = int(barcode_width * self.dpi / 72)
+            cell_h = int(barcode_height * self.dpi / 72)
+            pil_img = render_fitted_label(label['barcode_code'], style_code,
+                                          cell_w, cell_h)
+        else:
+            pil_img = label.get('barcode_image')  # PIL.Image 对象
+            if pil_img is None:
+                pil_img = render_sized_label(label['barcode_code'], style_code)
+        image = self._pdf.add_image(pil_img)
+        if self.dpi and pil_img.width <= cell_w and pil_img.height <= cell_h:
+            # 每个像素对应一个打印点，居中偏移取整数个像素
+            pixel = 72 / self.dpi
+            w, h = pil_img.width * pixel, pil_img.height * pixel
+            dx = (cell_w - pil_img.width) // 2 * pixel
+            dy = (cell_h - pil_img.height) // 2 * pixel
+        else:
+            # 保持宽高比缩放并居中，与 drawImage(preserveAspectRatio=True) 相同
+            scale = min(barcode_width / pil_img.width, barcode_height / pil_img.height)
+            w, h = pil_img.width * scale, pil_img.height * scale
+            dx = (barcode_width - w) / 2
+            dy = (barcode_height - h) / 2
+        content = ("q %s 0 0 %s %s %s cm /Im Do Q" % (
+            fmt_num(w), fmt_num(h), fmt_num(dx), fmt_num(dy))).encode()
+        return self._pdf.add_form(barcode_width, barcode_height, content,
+                                  xobjects={"Im": image})
+
+    def add(self, label):
+        """Place label on the sheet 'quantity' times"""
+        form_key = (label['barcode_code'], label.get('style_code', ''))
+        form = self._forms.get(form_key)
+        if form is None:
+            form = self._forms[form_key] = self._write_form(label)
+            if len(self._forms) > self.max_forms:
+                self._forms.popitem(last=False)
+        else:
+            self._forms.move_to_end(form_key)
+        form_name = "L%d" % form
+
+        # 一张图片画多次
+        for i in range(label['quantity']):
+            # 在当前格子引用条形码表单
+            x, y = cell_position(len(self._cells))
+            if self.dpi:
+                x, y = snap(x, self.dpi), snap(y, self.dpi)
+            self._cells.append(b"q 1 0 0 1 %s %s cm /%s Do Q" % (
+                fmt_num(x).encode(), fmt_num(y).encode(), form_name.encode()))
+            self._page_forms[form_name] = form
+            self.placed += 1
+            # 新页
+            if len(self._cells) >= max_items_per_page:
+                self.flush_page()
+
+    def flush_page(self):
+        """Write out the current page, if it has any labels"""
+        if not self._cells:
+            return
+        self._pdf.add_page(width, height, b"\n".join(self._cells),
+                           xobjects=self._page_forms)
+        self._cells = []
+        self._page_forms = {}
+
+    def close(self):
+        """Write the last page and finish the file"""
+        self.flush_page()
+        if not self._pdf.page_count:
+            # 与 reportlab 相同，空文档也输出一个空白页
+            self._pdf.add_page(width, height, b"")
+        self._pdf.close()
+
+
+def write_label_sheet(file_path, labels, vector=False, dpi=None):
+    """Lay labels out on A4 pages, 7 columns by 16 rows, each label
+    repeated 'quantity' times. vector=True draws bars and digits as
+    vector shapes instead of embedding raster images; dpi renders raster
+    labels for a printer of that resolution. labels may be any iterable
+    and is consumed lazily, see LabelSheetWriter.
+    Returns the number of labels placed."""
+    with LabelSheetWriter(file_path, vector=vector, dpi=dpi) as sheet:
+        for label in labels:
+            sheet.add(label)
+    return sheet.placed
@@ -0,0 +1,239 @@
+"""Vector rendering code for EAN-13 barcode
+
+The vector renderers lay a barcode out exactly like EAN13Renderer, in
+units of one raster pixel, but emit shapes instead of pixels: SVG
+rectangles, or bars drawn straight onto a reportlab canvas. Bars stay
+sharp at any printer resolution and nothing has to be rasterized or
+compressed.
+
+>>> EAN13SVGRenderer(code, left_bars, right_bars, GUARDS).write_file(
+...     "test.svg", bar_width=3)
+"""
+
+import re
+from xml.sax.saxutils import escape
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from .pdfwriter import fmt_num, pdf_string
+from .renderer import digit_step
+
+# Arial / Helvetica metrics as fractions of the font size, used to place
+# text where PIL would put it (PIL positions text by its ascender)
+ASCENT = 0.905
+CAP_HEIGHT = 0.716
+
+SVG_FONT = "Arial, Helvetica, sans-serif"
+PDF_FONT = "Helvetica"
+
+# a run of adjacent black modules
+_bar_run = re.compile("1+")
+
+
+class VectorLayout:
+    """Geometry of a rendered barcode, with y growing downwards:
+    width, height, bars as (x, y, w, h) and digits as (x, baseline, char)
+    in raster pixel units, plus the optional header line"""
+
+    def __init__(self, code, segments, bar_width, fontSize=20, spacing=1.0,
+                 header=None, headerFontSize=22.5):
+        num_bars = sum(len(bars) for bars, _ in segments)
+        quiet_width = bar_width * 9
+        self.width = (2 * quiet_width) + (num_bars * bar_width)
+        barcode_height = self.width // 2
+
+        # the header line sits above the barcode, as add_style_header does
+        top = 0
+        self.header = None
+        if header:
+            text_h = int(round(headerFontSize * CAP_HEIGHT))
+            self.header = (self.width / 2, 5 + headerFontSize * ASCENT,
+                           header, headerFontSize)
+            top = text_h + 10
+            self.height = barcode_height + text_h + 8
+        else:
+            self.height = barcode_height
+
+        # bars, one rectangle per run of black modules
+        self.bars = []
+        symbol_top = top + quiet_width // 2
+        current_x = quiet_width
+        for bars, full in segments:
+            bottom = top + int(barcode_height * (full and 0.9 or 0.8))
+            for run in _bar_run.finditer(bars):
+                self.bars.append((current_x + run.start() * bar_width,
+                                  symbol_top,
+                                  (run.end() - run.start()) * bar_width,
+                                  bottom - symbol_top))
+            current_x += len(bars) * bar_width
+
+        # digits, placed like EAN13Renderer.get_pilimage places them
+        font_size = digit_step(bar_width)
+        baseline = top + int(barcode_height * 0.785) + fontSize * ASCENT
+        self.fontSize = fontSize
+        self.digits = [(1 * bar_width, baseline, code[0])]
+        for i in range(1, 7):
+            self.digits.append((13 * bar_width + (i-1) * font_size * spacing,
+                                baseline, code[i]))
+        for i in range(7, 13):
+            self.digits.append((59 * bar_width + (i-7) * font_size * spacing,
+                                baseline, code[i]))
+
+    def fit(self, x, y, width, height):
+        """Return (scale, left, top) placing the layout inside the box
+        with lower left corner (x, y) and the given size in points,
+        centred and keeping its aspect ratio like
+        drawImage(preserveAspectRatio=True)"""
+        scale = min(width / self.width, height / self.height)
+        left = x + (width - self.width * scale) / 2
+        top = y + (height + self.height * scale) / 2
+        return scale, left, top
+
+
+class EAN13VectorRenderer:
+    """Base class for the vector renderers - given the code and
+    corresponding bar encodings and guard bars, works out the layout"""
+
+    width = None
+    height = None
+
+    def __init__(self, code, left_bars, right_bars, guards):
+        self.code = code
+        self.left_bars = left_bars
+        self.right_bars = right_bars
+        self.guards = guards
+
+    def get_layout(self, bar_width, fontSize=20, spacing=1.0, header=None,
+                   headerFontSize=22.5):
+        """Return the VectorLayout of this barcode"""
+        segments = ((self.guards[0], True),
+                    (self.left_bars, False),
+                    (self.guards[1], True),
+                    (self.right_bars, False),
+                    (self.guards[2], True))
+        layout = VectorLayout(self.code, segments, bar_width,
+                              fontSize=fontSize, spacing=spacing,
+                              header=header, headerFontSize=headerFontSize)
+        self.width = layout.width
+        self.height = layout.height
+        return layout
+
+
+class EAN13SVGRenderer(EAN13VectorRenderer):
+    """Renders the barcode as an SVG document, one rectangle per bar"""
+
+    def get_svg(self, bar_width, fontSize=20, spacing=1.0, header=None,
+                headerFontSize=22.5):
+        """Return the barcode as an SVG document string. header is an
+        optional line of text drawn above the barcode."""
+        layout = self.get_layout(bar_width, fontSize=fontSize,
+                                 spacing=spacing, header=header,
+                                 headerFontSize=headerFontSize)
+        parts = [
+            '<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+            'width="%d" height="%d" viewBox="0 0 %d %d">'
+            % (layout.width, layout.height, layout.width, layout.height),
+            '<rect width="100%" height="100%" fill="white"/>',
+            '<g fill="black" shape-rendering="crispEdges">',
+        ]
+        parts.extend('<rect x="%g" y="%g" width="%g" height="%g"/>' % bar
+                     for bar in layout.bars)
+        parts.append('</g>')
+        parts.append('<g fill="black" font-family="%s" font-size="%g">'
+                     % (SVG_FONT, layout.fontSize))
+        parts.extend('<text x="%g" y="%g">%s</text>' % digit
+                     for digit in layout.digits)
+        parts.append('</g>')
+        if layout.header:
+            x, y, text, size = layout.header
+            parts.append('<text x="%g" y="%g" font-family="%s" font-size="%g" '
+                         'text-anchor="middle" fill="black">%s</text>'
+                         % (x, y, SVG_FONT, size, escape(text)))
+        parts.append('</svg>')
+        return "\n".join(parts)
+
+    def write_file(self, filename, bar_width, fontSize=20, spacing=1.0,
+                   header=None, headerFontSize=22.5):
+        """Write the barcode out to an SVG file"""
+        with open(filename, "w", encoding="utf-8") as svg_file:
+            svg_file.write(self.get_svg(bar_width, fontSize=fontSize,
+                                        spacing=spacing, header=header,
+                                        headerFontSize=headerFontSize))
+
+
+class EAN13CanvasRenderer(EAN13VectorRenderer):
+    """Draws the barcode straight onto a reportlab canvas"""
+
+    def draw(self, canvas, x, y, width, height, bar_width=3, fontSize=20,
+             spacing=1.0, header=None, headerFontSize=22.5):
+        """Draw the barcode scaled to fit inside the box with lower left
+        corner (x, y) and the given size in points, centred and keeping
+        its aspect ratio like drawImage(preserveAspectRatio=True)"""
+        layout = self.get_layout(bar_width, fontSize=fontSize,
+                                 spacing=spacing, header=header,
+                                 headerFontSize=headerFontSize)
+        scale, left, top = layout.fit(x, y, width, height)
+
+        canvas.saveState()
+        canvas.setFillColorRGB(0, 0, 0)
+        path = canvas.beginPath()
+        for bar_x, bar_y, bar_w, bar_h in layout.bars:
+            path.rect(left + bar_x * scale, top - (bar_y + bar_h) * scale,
+                      bar_w * scale, bar_h * scale)
+        canvas.drawPath(path, stroke=0, fill=1)
+
+        canvas.setFont(PDF_FONT, layout.fontSize * scale)
+        for digit_x, baseline, char in layout.digits:
+            canvas.drawString(left + digit_x * scale, top - baseline * scale,
+                              char)
+        if layout.header:
+            header_x, baseline, text, size = layout.header
+            canvas.setFont(PDF_FONT, size * scale)
+            canvas.drawCentredString(left + header_x * scale,
+                                     top - baseline * scale, text)
+        canvas.restoreState()
+
+
+class EAN13PDFRenderer(EAN13VectorRenderer):
+    """Writes the barcode as raw PDF content stream operators, for use
+    without a reportlab canvas. Text is set in the font resource named
+    font_name, which must refer to Helvetica."""
+
+    def get_content(self, width, height, bar_width=3, fontSize=20,
+                    spacing=1.0, header=None, headerFontSize=22.5,
+                    font_name="Helv"):
+        """Return the operators drawing the barcode fitted into a box of
+        width x height points at the origin, as EAN13CanvasRenderer.draw
+        would draw it"""
+        layout = self.get_layout(bar_width, fontSize=fontSize,
+                                 spacing=spacing, header=header,
+                                 headerFontSize=headerFontSize)
+        scale, left, top = layout.fit(0, 0, width, height)
+
+        ops = ["q 0 g"]
+        ops.extend("%s %s %s %s re" % (
+            fmt_num(left + bar_x * scale),
+            fmt_num(top - (bar_y + bar_h) * scale),
+            fmt_num(bar_w * scale), fmt_num(bar_h * scale))
+            for bar_x, bar_y, bar_w, bar_h in layout.bars)
+        ops.append("f")
+        content = "\n".join(ops).encode()
+
+        font = ("/%s %s Tf" % (font_name,
+                               fmt_num(layout.fontSize * scale))).encode()
+        text = [b"BT", font]
+        for digit_x, baseline, char in layout.digits:
+            text.append(b"1 0 0 1 %s %s Tm %s Tj" % (
+                fmt_num(left + digit_x * scale).encode(),
+                fmt_num(top - baseline * scale).encode(), pdf_string(char)))
+        if layout.header:
+            header_x, baseline, header, size = layout.header
+            size *= scale
+            header_x = left + header_x * scale \
+                - stringWidth(header, PDF_FONT, size) / 2
+            text.append(b"/%s %s Tf 1 0 0 1 %s %s Tm %s Tj" % (
+                font_name.encode(), fmt_num(size).encode(),
+                fmt_num(header_x).encode(),
+                fmt_num(top - baseline * scale).encode(), pdf_string(header)))
+        text.append(b"ET Q")
+        return content + b"\n" + b"\n".join(text)
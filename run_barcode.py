@@ -10,10 +10,12 @@ import os
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
+from multiprocessing import freeze_support
 from PyQt5.QtWidgets import QApplication
 from src.barcode_generator.main import BarcodeGenerator
 
 def main():
+    freeze_support()  # 打包后的程序启动渲染子进程时需要
     app = QApplication(sys.argv)
 
     # 创建并显示主窗口
@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import QFrame, QGridLayout, QLabel, QLineEdit, QPushButton, QSpinBox, QHBoxLayout, QFileDialog, QMessageBox
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThreadPool, QTimer
 from PyQt5.QtGui import QPixmap
 from io import BytesIO
 import barcode
@@ -15,41 +15,39 @@ from reportlab.lib.colors import black
 from pdf2image import convert_from_bytes
 import sys
 sys.path.append('../..')
-from Encoder import EAN13Encoder
+from Encoder.label import LabelSpec, render_sized_label, sized_label_key
+from Encoder.encoding import normalize_code
+from Encoder.renderer import convert_mode, module_dpi, write_png
+from .render_worker import RenderTask, preview_qimage
 
 
-def calculate_barcode_width(style_code):
-    """根据文本实际渲染宽度设置条形码宽度"""
-    picWidth = 2
-    frontSize = 22.5
-    numberFontSize = 20
-    spacing = 1.0
-    if not style_code:
-        return {
-            'picWidth': picWidth,
-            'frontSize': frontSize,
-            'numberFontSize': numberFontSize,
-            'spacing': spacing
-        }  # 默认宽度
+# 输入停止变化多少毫秒后自动刷新预览
+preview_delay = 300
+# 预览图最大尺寸
+preview_size = (500, 200)
 
-    length = len(style_code)
-    if length >= 14 and length < 16:
-        picWidth = 3
-        frontSize = 29
-        numberFontSize = 30
-        spacing = 1.1
-    elif length >= 16 and length <= 20:
-        picWidth = 4
-        frontSize = 35
-        numberFontSize = 40
-        spacing = 1.2
+# 保存单个条形码图片的默认设置：'L' 为 8 位灰度，保留数字的抗锯齿边缘；
+# PNG 压缩级别 0-9；写入文件的打印分辨率，None 表示不写入
+save_mode = 'L'
+save_compress_level = 6
+save_dpi = None
 
-    return {
-        'picWidth': picWidth,
-        'frontSize': frontSize,
-        'numberFontSize': numberFontSize,
-        'spacing': spacing
-    }
+# 保存对话框中的黑白选项：1 位图（文件约为灰度的 1/8），并按标准模块宽度
+# (0.33 mm) 由每模块像素数算出打印分辨率写入文件
+png_filter = "PNG 图片 (*.png)"
+bw_png_filter = "PNG 黑白图片，按 0.33 mm 模块宽度打印 (*.png)"
+
+
+def validate_code(code_text):
+    """检查条形码编号，有错误时返回提示信息，否则返回 None"""
+    # 验证输入是否符合 EAN-13 格式；全角数字按半角数字处理，与编码器一致
+    code_text = normalize_code(code_text)
+    if not (code_text.isascii() and code_text.isdigit()):
+        return "请输入有效的条形码编号!"
+    # EAN-13 应该是 12 位数字，第 13 位是校验位，会自动计算
+    if len(code_text) < 12 or len(code_text) > 13:
+        return "EAN-13 条形码需要 12 位数字（第 13 位会自动计算）!"
+    return None
 
 # 添加自定义QSpinBox类来禁用鼠标滚轮事件
 class NoWheelSpinBox(QSpinBox):
@@ -61,10 +59,13 @@ class BarcodeItem(QFrame):
         super().__init__(parent)
         self.parent = parent
         self.itemID = index
-        self.barcode_image = None
+        self.spec = None  # 上次生成的标签描述（LabelSpec，不含图像）
         self.barcode_code = None
         self.style_code = ""
         self.selected = False
+        self.render_request = 0  # 最新一次渲染请求的编号
+        self.render_task = None  # 尚未返回结果的后台渲染任务
+        self.render_key = None   # 上次生成条形码时的输入，用于判断是否需要重新生成
         self.initUI()
         self.connectEvents()  # 添加事件连接
         
@@ -115,7 +116,7 @@ class BarcodeItem(QFrame):
         self.quantity_input.setMaximum(9999)
         self.quantity_input.setValue(1)
         self.generate_button = QPushButton('预览条形码')
-        self.generate_button.clicked.connect(self.generate_barcode)
+        self.generate_button.clicked.connect(self.preview_barcode)
         
         layout.addWidget(self.quantity_label, 2, 0)
         layout.addWidget(self.quantity_input, 2, 1)
@@ -141,92 +142,133 @@ class BarcodeItem(QFrame):
         button_layout.addWidget(self.save_button)
         button_layout.addWidget(self.save_pdf_button)
         layout.addLayout(button_layout, 4, 0, 1, 3)
+
+        # 输入停止变化后自动在后台刷新预览
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(preview_delay)
+        self.preview_timer.timeout.connect(self.request_preview)
+        self.code_input.textChanged.connect(self.preview_timer.start)
+        self.style_input.textChanged.connect(self.preview_timer.start)
+
+    def cancel_render(self):
+        """作废之前的渲染请求，返回新的请求编号"""
+        self.render_request += 1
+        if self.render_task is not None:
+            # 任务结束后由线程池自动释放，这里不能再调用它的 Qt 方法；
+            # 取消的任务开始运行时会直接返回
+            self.render_task.cancel()
+            self.render_task = None
+        return self.render_request
+
+    def request_preview(self):
+        """在后台线程渲染预览，输入不完整时不做任何提示"""
+        code_text = self.code_input.text().strip()
+        style_code = self.style_input.text().strip()
+        request_id = self.cancel_render()
+        if validate_code(code_text):
+            return
+
+        task = RenderTask(request_id, code_text, style_code,
+                          preview_size=preview_size)
+        task.signals.finished.connect(self.on_render_finished)
+        task.signals.failed.connect(self.on_render_failed)
+        self.render_task = task
+        QThreadPool.globalInstance().start(task)
+
+    def preview_barcode(self):
+        """预览按钮：检查输入并立即在后台渲染"""
+        # 先取消选中状态
+        self.clearSelection()
+        self.preview_timer.stop()
+
+        error = validate_code(self.code_input.text().strip())
+        if error:
+            QMessageBox.warning(self, "输入错误", error)
+            return
+        self.request_preview()
+
+    def on_render_finished(self, request_id, image, preview):
+        # 输入已经改变，丢弃过时的结果
+        if request_id != self.render_request:
+            return
+        task, self.render_task = self.render_task, None
+        self.show_barcode(task.code, task.style_code, QPixmap.fromImage(preview))
+
+    def on_render_failed(self, request_id, message):
+        if request_id != self.render_request:
+            return
+        self.render_task = None
+        QMessageBox.critical(self, "错误", f"生成条形码时出错: {message}")
+
+    def show_barcode(self, code_text, style_code, pixmap):
+        """显示渲染结果并更新条目数据，成功时返回 True"""
+        # 保存条形码值以便后续PDF生成；只记录标签描述，图像需要时再渲染，
+        # 由有容量上限的渲染缓存共享
+        try:
+            spec = LabelSpec(code_text, style_code,
+                             self.quantity_input.value(), self.itemID)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"生成条形码时出错: {str(e)}")
+            return False
+        self.barcode_code = code_text
+        self.style_code = style_code
+        self.spec = spec
+        self.render_key = (code_text, self.spec.key())
+        self.barcode_label.setPixmap(pixmap)
+
+        # 启用保存按钮
+        self.save_button.setEnabled(True)
+        self.save_pdf_button.setEnabled(True)
+
+        self.parent.refreshData(self.itemID)
+        return True
+
+    def input_key(self):
+        """当前输入对应的键：编号、完整码和款号决定的尺寸参数；编号无效时返回 None"""
+        code_text = self.code_input.text().strip()
+        if validate_code(code_text):
+            return None
+        return (code_text, sized_label_key(code_text, self.style_input.text().strip()))
+
+    def is_dirty(self):
+        """输入自上次生成后是否有变化（包括从未生成过）"""
+        key = self.input_key()
+        return key is None or key != self.render_key
+
+    def ensure_barcode(self):
+        """输入没有变化时直接复用上次的结果，否则重新生成"""
+        if self.is_dirty():
+            return self.generate_barcode()
+        # 数量不影响图像，只需更新条目数据
+        self.parent.refreshData(self.itemID)
+        return True
+
     def generate_barcode(self):
+        """在当前线程立即生成条形码，供保存和导出使用"""
         # 先取消选中状态
         self.clearSelection()
+        self.preview_timer.stop()
+        self.cancel_render()
         
         # 获取输入文本
         code_text = self.code_input.text().strip()
-        self.style_code = self.style_input.text().strip()
+        style_code = self.style_input.text().strip()
+        self.style_code = style_code
         
-        # 验证输入是否符合 EAN-13 格式
-        if not code_text.isdigit():
-            QMessageBox.warning(self, "输入错误", "请输入有效的条形码编号!")
-            return False
-            
-        # EAN-13 应该是 12 位数字，第 13 位是校验位，会自动计算
-        if len(code_text) < 12 or len(code_text) > 13:
-            QMessageBox.warning(self, "输入错误", "EAN-13 条形码需要 12 位数字（第 13 位会自动计算）!")
+        error = validate_code(code_text)
+        if error:
+            QMessageBox.warning(self, "输入错误", error)
             return False
-        barcode_params = calculate_barcode_width(self.style_code)
         try:
-            # 保存条形码值以便后续PDF生成
-            self.barcode_code = code_text
+            # 生成条形码（含款号表头），相同参数直接取渲染缓存
+            image = render_sized_label(code_text, style_code)
             
-            # 创建内存缓冲区来存储条形码图像
-            buffer = BytesIO()
+            # 直接包装内存中的像素数据并缩放，不经过PNG编码/解码和中间复制
+            pixmap = QPixmap.fromImage(preview_qimage(image, preview_size))
             
-            # 使用pystrich生成EAN13条形码到内存缓冲区
-            encoder = EAN13Encoder(self.barcode_code)
-            image_data = encoder.get_imagedata(bar_width=barcode_params['picWidth'],
-                                               fontSize=barcode_params['numberFontSize'],
-                                               spacing=barcode_params['spacing'])  # 获取图像数据
-
-            # 将图像数据加载到PIL Image对象
-            barcode_image = Image.open(BytesIO(image_data))
-            
-            # 如果有款号，添加到条形码上方
-            if self.style_code:
-                im = barcode_image.convert("RGB")
-                # 尝试加载系统字体，否则用默认
-                try:
-                    font = ImageFont.truetype("arial.ttf", barcode_params['frontSize'])
-                except IOError:
-                    font = ImageFont.load_default()
-                
-                text = f"NO: {self.style_code}"
-                draw_temp = ImageDraw.Draw(im)
-                
-                # 使用 font.getbbox 来测量文本尺寸
-                bbox = font.getbbox(text)
-                text_w = bbox[2] - bbox[0]
-                text_h = bbox[3] - bbox[1]
-                
-                # 新建一个高出文字高度的白色画布
-                print(f"文字宽度: {text_w}, 文字高度: {text_h}")
-                print(f"条形码宽度: {im.width}, 条形码高度: {im.height}")
-                canvas_img = Image.new("RGB", (im.width, im.height + text_h + 8), "white")
-                draw = ImageDraw.Draw(canvas_img)
-                
-                canvas_img.paste(im, (0, text_h + 10))
-                draw.text(((im.width - text_w)//2, 5), text, font=font, fill="black")
-                # 把原条码图粘贴到下面
-                
-                # 保存最终图像
-                self.barcode_image = canvas_img
-            else:
-                # 如果没有款号，直接使用原始条形码
-                self.barcode_image = barcode_image
-            
-            # 将图像保存到缓冲区
-            self.barcode_image.save(buffer, format='PNG')
-            
-            # 重置缓冲区指针位置并创建QPixmap
-            buffer.seek(0)
-            pixmap = QPixmap()
-            pixmap.loadFromData(buffer.read())
-            
-            # 调整大小并显示
-            pixmap = pixmap.scaled(500, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.barcode_label.setPixmap(pixmap)
-            
-            # 启用保存按钮
-            self.save_button.setEnabled(True)
-            self.save_pdf_button.setEnabled(True)
-
-            self.parent.refreshData(self.itemID)
-
-            return True
+            # 显示
+            return self.show_barcode(code_text, style_code, pixmap)
 
 
         except Exception as e:
@@ -235,12 +277,13 @@ class BarcodeItem(QFrame):
 
 
     def save_barcode(self):
-        self.generate_barcode()
-        if self.barcode_image:
+        self.ensure_barcode()
+        if self.spec:
             # 打开文件对话框
             file_name = f"{self.style_code}_{self.barcode_code}" if self.style_code else f"{self.barcode_code}"
-            file_path, _ = QFileDialog.getSaveFileName(
-                self, "保存条形码", file_name, "PNG 图片 (*.png);;JPEG 图片 (*.jpg);;所有文件 (*.*)")
+            file_path, selected_filter = QFileDialog.getSaveFileName(
+                self, "保存条形码", file_name,
+                f"{png_filter};;{bw_png_filter};;JPEG 图片 (*.jpg);;所有文件 (*.*)")
             
             if file_path:
                 try:
@@ -249,15 +292,24 @@ class BarcodeItem(QFrame):
                            file_path.endswith('.jpeg')):
                         file_path += '.png'
                     
-                    # 保存图像
-                    self.barcode_image.save(file_path)
+                    # 保存图像；只有选择黑白选项时才转为 1 位图并写入打印分辨率
+                    mode, dpi = save_mode, save_dpi
+                    if selected_filter == bw_png_filter:
+                        mode, dpi = '1', module_dpi(self.spec.bar_width)
+                    image = self.spec.render()
+                    if file_path.endswith('.png'):
+                        write_png(image, file_path, mode=mode,
+                                  compress_level=save_compress_level, dpi=dpi)
+                    else:
+                        params = {'dpi': (dpi, dpi)} if dpi else {}
+                        convert_mode(image, mode).save(file_path, **params)
                     QMessageBox.information(self, "成功", f"条形码已保存到 {file_path}")
                     
                 except Exception as e:
                     QMessageBox.critical(self, "错误", f"保存条形码时出错: {str(e)}")
 
     def save_to_pdf(self):
-        self.generate_barcode()
+        self.ensure_barcode()
         self.parent.save_pdf(type='single', itemID=self.itemID)
 
     def connectEvents(self):
@@ -281,10 +333,6 @@ class BarcodeItem(QFrame):
         widget.__class__.mousePressEvent(widget, event)
     
     def get_barcode_data(self):
-        return {
-                'style_code': self.style_code,
-                'barcode_code': self.barcode_code,
-                'quantity': self.quantity_input.value(),
-                'barcode_image': self.barcode_image,
-                'itemID': self.itemID
-            }
+        """返回条目的 LabelSpec，数量取当前输入"""
+        self.spec.quantity = self.quantity_input.value()
+        return self.spec
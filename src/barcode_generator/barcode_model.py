@@ -0,0 +1,283 @@
+"""列表模式：用 QAbstractListModel + 自定义委托显示大量条目
+
+每个条目只是一个字典（款号、条形码编号、数量），不再为每一项创建
+一整套 QFrame 控件。视图只绘制可见的行，缩略图在后台线程按需渲染并
+缓存最近使用的一部分，几千个条目也能流畅滚动。
+"""
+
+from collections import OrderedDict
+
+from PyQt5.QtCore import (QAbstractListModel, QModelIndex, QRect, QSize, Qt,
+                          QThreadPool)
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtWidgets import (QApplication, QHBoxLayout, QLineEdit, QStyle,
+                             QStyledItemDelegate, QWidget)
+
+from Encoder.label import LabelSpec
+
+from .BarcodeItem import NoWheelSpinBox, validate_code
+from .render_worker import RenderTask
+
+# 自定义数据角色
+StyleRole = Qt.UserRole + 1
+CodeRole = Qt.UserRole + 2
+QuantityRole = Qt.UserRole + 3
+PreviewRole = Qt.UserRole + 4
+
+# 缩略图尺寸、缓存数量和同时排队的渲染任务数
+thumbnail_size = (240, 72)
+thumbnail_cache_size = 512
+max_pending_renders = 64
+
+# 列表中每一行的高度
+row_height = 84
+
+
+def new_entry(style_code="", barcode_code="", quantity=1):
+    return {'style_code': style_code, 'barcode_code': barcode_code,
+            'quantity': quantity}
+
+
+class BarcodeListModel(QAbstractListModel):
+    """条目列表，每行一个 {'style_code', 'barcode_code', 'quantity'} 字典"""
+
+    _roles = {StyleRole: 'style_code', CodeRole: 'barcode_code',
+              QuantityRole: 'quantity'}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+        self._thumbnails = OrderedDict()  # (条码, 款号) -> QPixmap
+        self._pending = OrderedDict()     # 请求编号 -> RenderTask
+        self._pending_keys = {}           # (条码, 款号) -> 请求编号
+        self._waiting_rows = {}           # (条码, 款号) -> 视图绘制时还没有缩略图的行
+        self._next_request = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.DisplayRole:
+            return entry['barcode_code']
+        if role in self._roles:
+            return entry[self._roles[role]]
+        if role == PreviewRole:
+            return self.thumbnail(entry['barcode_code'], entry['style_code'],
+                                  index.row())
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role not in self._roles:
+            return False
+        field = self._roles[role]
+        if field == 'quantity':
+            value = int(value)
+        else:
+            value = str(value).strip()
+        entry = self.entries[index.row()]
+        if entry[field] == value:
+            return True
+        entry[field] = value
+        self.dataChanged.emit(index, index, [role, PreviewRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def append_entries(self, entries):
+        """一次性在末尾追加多个条目"""
+        entries = list(entries)
+        if not entries:
+            return
+        first = len(self.entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self.entries.extend(entries)
+        self.endInsertRows()
+
+    def remove_rows(self, rows):
+        """删除给定的行，连续的行合并为一次删除"""
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.entries[first:last + 1]
+            self.endRemoveRows()
+
+    def set_entries(self, entries):
+        """替换全部条目"""
+        self.beginResetModel()
+        self.entries = list(entries)
+        self._waiting_rows.clear()
+        self.endResetModel()
+
+    def thumbnail(self, code, style_code, row=None):
+        """返回缓存的缩略图；没有时在后台渲染，完成后通知视图重绘第 row 行。
+        只有视图正在绘制的行会来取缩略图，所以只需记住这些行"""
+        if validate_code(code):
+            return None
+        key = (code, style_code)
+        pixmap = self._thumbnails.get(key)
+        if pixmap is not None:
+            self._thumbnails.move_to_end(key)
+            return pixmap
+        if row is not None:
+            self._waiting_rows.setdefault(key, set()).add(row)
+        if key not in self._pending_keys:
+            self._request_thumbnail(key)
+        return None
+
+    def _request_thumbnail(self, key):
+        self._next_request += 1
+        task = RenderTask(self._next_request, *key, preview_size=thumbnail_size)
+        task.signals.finished.connect(self._on_thumbnail_finished)
+        task.signals.failed.connect(self._on_thumbnail_failed)
+        self._pending[task.request_id] = task
+        self._pending_keys[key] = task.request_id
+        QThreadPool.globalInstance().start(task)
+
+        # 快速滚动时只保留最近请求的任务，滚出视图的行不再渲染
+        while len(self._pending) > max_pending_renders:
+            _, stale = self._pending.popitem(last=False)
+            del self._pending_keys[(stale.code, stale.style_code)]
+            self._waiting_rows.pop((stale.code, stale.style_code), None)
+            stale.cancel()
+
+    def _take_pending(self, request_id):
+        task = self._pending.pop(request_id, None)
+        if task is not None:
+            del self._pending_keys[(task.code, task.style_code)]
+        return task
+
+    def _take_waiting_rows(self, key):
+        """等待 key 缩略图、现在仍显示这个条目的行；增删行后行号可能已经
+        变了，视图重绘时会重新记录"""
+        rows = self._waiting_rows.pop(key, ())
+        return sorted(row for row in rows if row < len(self.entries)
+                      and (self.entries[row]['barcode_code'],
+                           self.entries[row]['style_code']) == key)
+
+    def _on_thumbnail_finished(self, request_id, image, preview):
+        task = self._take_pending(request_id)
+        if task is None:
+            return
+        key = (task.code, task.style_code)
+        self._thumbnails[key] = QPixmap.fromImage(preview)
+        while len(self._thumbnails) > thumbnail_cache_size:
+            self._thumbnails.popitem(last=False)
+        # 只通知绘制时在等这张缩略图的行，不必扫描全部条目
+        for row in self._take_waiting_rows(key):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [PreviewRole])
+
+    def _on_thumbnail_failed(self, request_id, message):
+        task = self._take_pending(request_id)
+        if task is not None:
+            self._waiting_rows.pop((task.code, task.style_code), None)
+
+    def get_barcode_data(self):
+        """返回 ({行号: LabelSpec}, [无效的行号])，与
+        BarcodeItem.get_barcode_data() 相同，图像在导出时按需渲染"""
+        data = {}
+        invalid = []
+        for row, entry in enumerate(self.entries):
+            if validate_code(entry['barcode_code']):
+                invalid.append(row)
+                continue
+            try:
+                data[row] = LabelSpec(entry['barcode_code'], entry['style_code'],
+                                      entry['quantity'], row)
+            except Exception:
+                invalid.append(row)
+        return data, invalid
+
+
+class BarcodeEditor(QWidget):
+    """行内编辑器：款号、条形码编号和数量"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAutoFillBackground(True)
+        self.loaded = False
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        self.style_input = QLineEdit()
+        self.style_input.setPlaceholderText('款号')
+        self.code_input = QLineEdit()
+        self.code_input.setPlaceholderText('12位或13位数字')
+        self.quantity_input = NoWheelSpinBox()
+        self.quantity_input.setMinimum(1)
+        self.quantity_input.setMaximum(9999)
+        layout.addWidget(self.style_input, 2)
+        layout.addWidget(self.code_input, 3)
+        layout.addWidget(self.quantity_input, 1)
+        self.setFocusProxy(self.code_input)
+
+
+class BarcodeDelegate(QStyledItemDelegate):
+    """绘制一行条目：左侧文字，右侧缩略图"""
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), row_height)
+
+    def paint(self, painter, option, index):
+        # 背景和选中状态按当前界面风格绘制
+        self.initStyleOption(option, index)
+        option.text = ""
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+
+        rect = option.rect.adjusted(8, 4, -8, -4)
+        thumb_w = min(thumbnail_size[0], rect.width() // 2)
+        text_rect = QRect(rect.left(), rect.top(),
+                          rect.width() - thumb_w - 8, rect.height())
+        thumb_rect = QRect(rect.right() - thumb_w + 1, rect.top(),
+                           thumb_w, rect.height())
+
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.setPen(option.palette.highlightedText().color())
+        style_code = index.data(StyleRole)
+        code = index.data(CodeRole)
+        lines = [f"款号: {style_code}", f"条形码编号: {code}",
+                 f"数量: {index.data(QuantityRole)}"]
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, "\n".join(lines))
+
+        pixmap = index.data(PreviewRole)
+        if pixmap is not None:
+            if pixmap.width() > thumb_rect.width() or pixmap.height() > thumb_rect.height():
+                pixmap = pixmap.scaled(thumb_rect.size(), Qt.KeepAspectRatio,
+                                       Qt.SmoothTransformation)
+            painter.drawPixmap(thumb_rect.left() + (thumb_rect.width() - pixmap.width()) // 2,
+                               thumb_rect.top() + (thumb_rect.height() - pixmap.height()) // 2,
+                               pixmap)
+        else:
+            text = "(条形码编号无效)" if validate_code(code) else "(正在生成…)"
+            painter.drawText(thumb_rect, Qt.AlignCenter, text)
+        painter.restore()
+
+    def createEditor(self, parent, option, index):
+        return BarcodeEditor(parent)
+
+    def setEditorData(self, editor, index):
+        # 视图在数据变化时会再次调用，不要覆盖正在输入的内容
+        if editor.loaded:
+            return
+        editor.loaded = True
+        editor.style_input.setText(index.data(StyleRole))
+        editor.code_input.setText(index.data(CodeRole))
+        editor.quantity_input.setValue(index.data(QuantityRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.style_input.text(), StyleRole)
+        model.setData(index, editor.code_input.text(), CodeRole)
+        model.setData(index, editor.quantity_input.value(), QuantityRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        editor.setGeometry(option.rect)
@@ -1,43 +1,70 @@
 import sys
 import os
+import logging
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QPushButton, 
                             QMessageBox, QFileDialog, QSpinBox, QScrollArea,
-                            QFrame, QGridLayout, QSplashScreen)  # 添加QSplashScreen
+                            QFrame, QGridLayout, QSplashScreen, QCheckBox,
+                            QListView, QStackedWidget, QAbstractItemView,
+                            QComboBox)  # 添加QSplashScreen
 from PyQt5.QtGui import QPixmap, QIcon
-from PyQt5.QtCore import Qt, QTimer  # 添加QTimer
+from PyQt5.QtCore import (Qt, QTimer, QEventLoop, QThreadPool, QSettings,  # 添加QTimer
+                          QStandardPaths)
 from PyQt5.QtSvg import QSvgRenderer
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
 from .BarcodeItem import BarcodeItem
+from .barcode_model import BarcodeListModel, BarcodeDelegate, new_entry
+from .render_worker import FunctionTask
+from Encoder.sheet import write_label_sheet
+from Encoder.parallel import make_executor, render_many, render_stream
+from Encoder.cache import render_cache
+from Encoder.label import disable_disk_cache, enable_disk_cache, render_sized_label
+from Encoder.batch import read_labels
 from PyQt5.QtGui import QPainter
-
-width, height = A4  # A4: 595 x 842 points
-
-# 设置条形码尺寸参数
-barcode_width = 90   # 单个条形码宽度（点）
-barcode_height = 45   # 单个条形码高度（点）
-barcodes_per_row = 7  # 每行放置的条形码数量
-
-# 设置页面边距
-margin_x = 10  # 左右边距（点）
-margin_y = 32  # 上下边距（点）
-
-# 计算行距和列距
-row_spacing = barcode_height + 5  # 行距：条码高 + 文本间隔
-col_spacing = (width - 2 * margin_x) / barcodes_per_row
-max_items_per_page = barcodes_per_row * 16  # 每页最多 16 行
-
-
+from multiprocessing import freeze_support
+
+logger = logging.getLogger(__name__)
+
+# 导出前并行预渲染的参数
+render_workers = None      # 渲染进程数，None 表示使用全部CPU核
+render_chunksize = 16      # 每个进程任务包含的条码数
+# 进程池在后台线程中创建，不能 fork 带有多个线程的 Qt 进程，改用 spawn 启动子进程
+render_start_method = 'spawn'
+# 不同条码达到此数量才启用进程池。spawn 启动的子进程要重新导入 PIL、numpy 和
+# reportlab，每次导出约多花 0.3-0.5 秒；逐条渲染一个标签约 0.5-2 毫秒，
+# 实测 64 个标签逐条 0.12 秒、进程池 0.53 秒，几百个以上进程池才更快
+parallel_min_labels = 512
+
+# 批量导入的条目超过此数量时自动切换到列表模式
+list_mode_threshold = 300
+# 导入结果中最多列出的错误行数
+max_reported_errors = 20
+
+# 导入时跳过一行的原因，键与 Encoder.batch.MESSAGES 相同
+import_messages = {
+    "bad_row": "不是有效的 JSON 对象",
+    "bad_code": "条形码编号需要 12 位或 13 位数字，实际为 “%s”",
+    "bad_quantity": "数量必须是整数，实际为 “%s”",
+    "low_quantity": "数量至少为 1，实际为 %d",
+    "check_digit": "%s 的校验位应为 %d",
+}
+
+# 渲染结果的磁盘缓存：下次启动时直接读取，不再重新渲染。默认关闭，
+# 勾选“磁盘缓存”后开启并记住设置；目录为 None 时使用系统的缓存目录
+disk_cache_dir = None
+disk_cache_bytes = 256 * 1024 * 1024
+
+# 可选的标签打印机分辨率：按此分辨率渲染位图并原样放入PDF，打印时不再缩放
+printer_dpis = (203, 300, 600)
 
 class BarcodeGenerator(QMainWindow):
     def __init__(self):
         super().__init__()
         self.barcode_items = {}  # 用于存储所有条目
         self.selected_items = []  # 用于追踪当前选中的多个条目
-        self.barcode_data_dict = {}  # 用于存储条形码数据
+        self.barcode_data_dict = {}  # 每个条目的 LabelSpec（不含图像）
         self.itemIdentifier = 0
+        self.list_mode = False  # 列表模式：用模型/视图代替每条一个控件
+        self.settings = QSettings('barcode', 'barcode_generator')
         self.set_application_icon()
         self.initUI()
         
@@ -65,10 +92,26 @@ class BarcodeGenerator(QMainWindow):
         # 创建主布局
         main_layout = QVBoxLayout(central_widget)
         
+        # 两种显示方式：每个条目一个控件，或者列表模式
+        self.view_stack = QStackedWidget()
+        main_layout.addWidget(self.view_stack)
+        
         # 创建滚动区域用于容纳多个条目
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
-        main_layout.addWidget(scroll_area)
+        self.view_stack.addWidget(scroll_area)
+        
+        # 列表模式：只绘制可见的行，适合几千个条目
+        self.barcode_model = BarcodeListModel(self)
+        self.barcode_view = QListView()
+        self.barcode_view.setModel(self.barcode_model)
+        self.barcode_view.setItemDelegate(BarcodeDelegate(self.barcode_view))
+        self.barcode_view.setUniformItemSizes(True)
+        self.barcode_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.barcode_view.setEditTriggers(QAbstractItemView.DoubleClicked |
+                                          QAbstractItemView.EditKeyPressed |
+                                          QAbstractItemView.SelectedClicked)
+        self.view_stack.addWidget(self.barcode_view)
         
         # 创建容器窗口部件
         scroll_content = QWidget()
@@ -98,10 +141,20 @@ class BarcodeGenerator(QMainWindow):
         self.clear_all_button = QPushButton('一键清空')
         self.clear_all_button.clicked.connect(self.clear_all_items)
         
+        # 从CSV或Excel表格批量导入条目
+        self.import_button = QPushButton('批量导入')
+        self.import_button.clicked.connect(self.import_entries)
+        
+        # 切换列表模式
+        self.list_mode_checkbox = QCheckBox('列表模式')
+        self.list_mode_checkbox.toggled.connect(self.set_list_mode)
+        
         # 添加按钮到上层布局
         top_button_layout.addWidget(self.add_item_button)
         top_button_layout.addWidget(self.delete_items_button)
         top_button_layout.addWidget(self.clear_all_button)
+        top_button_layout.addWidget(self.import_button)
+        top_button_layout.addWidget(self.list_mode_checkbox)
         
         # 下层按钮布局
         bottom_button_layout = QHBoxLayout()
@@ -114,9 +167,30 @@ class BarcodeGenerator(QMainWindow):
         self.separate_pdf_button = QPushButton('分开保存PDF')
         self.separate_pdf_button.clicked.connect(lambda: self.save_pdf(type='separate'))
         
+        # 矢量输出：直接在PDF中绘制条形，不嵌入位图
+        self.vector_checkbox = QCheckBox('矢量输出')
+        
+        # 位图分辨率：自动缩放，或按打印机分辨率精确渲染
+        self.dpi_combo = QComboBox()
+        self.dpi_combo.addItem('自动缩放', None)
+        for dpi in printer_dpis:
+            self.dpi_combo.addItem(f'打印机 {dpi} dpi', dpi)
+        self.vector_checkbox.toggled.connect(
+            lambda checked: self.dpi_combo.setEnabled(not checked))
+        
+        # 磁盘缓存：需要用户开启
+        self.disk_cache_checkbox = QCheckBox('磁盘缓存')
+        self.disk_cache_checkbox.setToolTip('把渲染好的标签保存在系统缓存目录中，下次启动时直接读取')
+        self.disk_cache_checkbox.toggled.connect(self.set_disk_cache)
+        self.disk_cache_checkbox.setChecked(
+            self.settings.value('disk_cache', False, type=bool))
+        
         # 添加按钮到下层布局
         bottom_button_layout.addWidget(self.merge_pdf_button)
         bottom_button_layout.addWidget(self.separate_pdf_button)
+        bottom_button_layout.addWidget(self.vector_checkbox)
+        bottom_button_layout.addWidget(self.dpi_combo)
+        bottom_button_layout.addWidget(self.disk_cache_checkbox)
         
         # 将上下两层布局添加到容器中
         buttons_container.addLayout(top_button_layout)
@@ -125,7 +199,25 @@ class BarcodeGenerator(QMainWindow):
         # 将按钮容器添加到主布局
         main_layout.addLayout(buttons_container)
         
+    def set_disk_cache(self, enabled):
+        """开启或关闭磁盘缓存，并记住选择"""
+        self.settings.setValue('disk_cache', enabled)
+        if not enabled:
+            disable_disk_cache()
+            return
+        directory = disk_cache_dir or os.path.join(
+            QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation), 'barcode')
+        enable_disk_cache(directory, disk_cache_bytes)
+
     def add_barcode_item(self):
+        if self.list_mode:
+            # 列表模式下追加一行并直接进入编辑
+            self.barcode_model.append_entries([new_entry()])
+            index = self.barcode_model.index(self.barcode_model.rowCount() - 1)
+            self.barcode_view.scrollTo(index)
+            self.barcode_view.setCurrentIndex(index)
+            self.barcode_view.edit(index)
+            return
         item = BarcodeItem(self, self.itemIdentifier)
         self.barcode_items[self.itemIdentifier] = item
         self.items_layout.addWidget(item)
@@ -135,6 +227,9 @@ class BarcodeGenerator(QMainWindow):
         reply = QMessageBox.question(self, '确认', '确定要清空所有条目吗？',
                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
+            if self.list_mode:
+                self.barcode_model.set_entries([new_entry()])
+                return
             # 移除所有条目
             for item_id, item_widget in list(self.barcode_items.items()):  # 使用list()创建副本进行迭代
                 self.items_layout.removeWidget(item_widget)
@@ -182,7 +277,8 @@ class BarcodeGenerator(QMainWindow):
                 if not file_path.endswith('.pdf'):
                     file_path += '.pdf'
                 # 创建合并的PDF
-                self.generate_merged_pdf(file_path, barcode_data_list)
+                self.generate_merged_pdf(file_path, barcode_data_list,
+                                         vector=self.vector_checkbox.isChecked())
                 QMessageBox.information(self, "成功", f"条形码已保存！")
                 return True
                 
@@ -190,16 +286,28 @@ class BarcodeGenerator(QMainWindow):
                 QMessageBox.critical(self, "错误", f"保存PDF时出错: {str(e)}")
                 return False
     
-        for v in self.barcode_items.values():
-            if not v.generate_barcode():
-                QMessageBox.warning(self, "错误", "出现错误！")
+        if self.list_mode:
+            # 列表模式：无效的行一次性提示，图像在写PDF时按需渲染
+            barcode_data_dict, invalid = self.barcode_model.get_barcode_data()
+            if invalid:
+                rows = "、".join(str(row + 1) for row in invalid[:20])
+                more = f" 等 {len(invalid)} " if len(invalid) > 20 else " "
+                QMessageBox.warning(self, "输入错误",
+                                    f"第 {rows}{more}行的条形码编号无效，"
+                                    "需要 12 位或 13 位数字！")
                 return
-                
-            
-        for item in self.barcode_items.values():
-            item.generate_barcode()
+        else:
+            # 只重新生成输入有变化的条目，先在后台渲染进缓存，
+            # 下面的 generate_barcode 直接命中缓存；其余条目复用上次的结果
+            dirty = [item for item in self.barcode_items.values() if item.is_dirty()]
+            self.prerender_items(dirty)
+            for v in self.barcode_items.values():
+                if not v.ensure_barcode():
+                    QMessageBox.warning(self, "错误", "出现错误！")
+                    return
+            barcode_data_dict = self.barcode_data_dict
         if type == 'merge':
-            generate_pdf(self, self.barcode_data_dict)
+            generate_pdf(self, barcode_data_dict)
         elif type == 'separate':
             # 选择保存目录
             dir_path = QFileDialog.getExistingDirectory(self, "选择保存目录")
@@ -208,13 +316,14 @@ class BarcodeGenerator(QMainWindow):
             
             try:
                 success_count = 0
-                for k,v in self.barcode_data_dict.items():
+                for k,v in barcode_data_dict.items():
                     # 创建文件名
-                    file_name = f"{v['style_code']}_{v['barcode_code']}" if v['style_code'] else f"{v['barcode_code']}"
+                    file_name = f"{v.style_code}_{v.barcode_code}" if v.style_code else f"{v.barcode_code}"
                     file_path = os.path.join(dir_path, f"{file_name}.pdf")
                     
                     # 生成单个PDF
-                    self.generate_merged_pdf(file_path, {k:v})
+                    self.generate_merged_pdf(file_path, {k:v},
+                                             vector=self.vector_checkbox.isChecked())
                     success_count += 1
 
                 QMessageBox.information(self, "成功", f"已成功保存 {success_count} 个PDF文件！")
@@ -222,59 +331,58 @@ class BarcodeGenerator(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"保存分开PDF时出错: {str(e)}")
         elif type == 'single':
-            for k,v in self.barcode_data_dict.items():
+            for k,v in barcode_data_dict.items():
                 if k == itemID:
                     generate_pdf(self,{k:v})
 
     
     
 
-    def generate_merged_pdf(self, file_path, barcode_data_dict):
-        # 创建一个PDF画布，使用A4纸张大小
-        c = canvas.Canvas(file_path, pagesize=A4)
-        
-
-        # 追踪当前位置
-        current_row = 0
-        current_col = 0
-        items_on_page = 0
-
-
-        for entry in barcode_data_dict:
-            pil_img = barcode_data_dict[entry]['barcode_image']  # PIL.Image 对象
-            quantity = barcode_data_dict[entry]['quantity']
-            style_code = barcode_data_dict[entry].get('style_code', '')
-
-            # 一张图片画多次
-            for i in range(quantity):
-                # 新页
-                if items_on_page >= max_items_per_page:
-                    c.showPage()
-                    current_row = current_col = items_on_page = 0
-
-                # 计算左下角坐标
-                x = margin_x + current_col * col_spacing
-                y = height - margin_y - (current_row+1) * row_spacing + 20
-
-                # 转成 ReportLab ImageReader
-                img_reader = ImageReader(pil_img)
-
-                # 绘制图像
-                c.drawImage(img_reader,
-                            x, y,
-                            width=barcode_width,
-                            height=barcode_height,
-                            preserveAspectRatio=True,
-                            mask='auto')
-
-                # 更新位置
-                current_col += 1
-                if current_col >= barcodes_per_row:
-                    current_col = 0
-                    current_row += 1
-                items_on_page += 1
+    def run_in_background(self, function, *args):
+        """在线程池中执行 function 并等待其结束，等待期间界面保持响应；
+        function 抛出的异常在这里重新抛出"""
+        # 执行期间禁止再次导出或增删条目
+        buttons = [self.add_item_button, self.delete_items_button,
+                   self.clear_all_button, self.import_button,
+                   self.merge_pdf_button, self.separate_pdf_button,
+                   self.list_mode_checkbox]
+        for button in buttons:
+            button.setEnabled(False)
+        loop = QEventLoop()
+        task = FunctionTask(function, *args)
+        task.signals.done.connect(loop.quit)
+        QThreadPool.globalInstance().start(task)
+        loop.exec_()
+        for button in buttons:
+            button.setEnabled(True)
+        if task.error is not None:
+            raise task.error
+
+    def prerender_items(self, items=None):
+        """在后台渲染 items（默认为所有条目）的条形码并存入渲染缓存"""
+        if items is None:
+            items = self.barcode_items.values()
+        labels = []
+        for item in items:
+            code_text = item.code_input.text().strip()
+            if code_text.isdigit() and 12 <= len(code_text) <= 13:
+                labels.append({'barcode_code': code_text,
+                               'style_code': item.style_input.text().strip()})
+        if not labels:
+            return
+        try:
+            self.run_in_background(render_labels, labels)
+        except Exception as e:
+            # 预渲染失败时导出会逐条渲染，只记录日志
+            logger.warning("预渲染失败: %s", e, exc_info=True)
 
-        c.save()
+    def generate_merged_pdf(self, file_path, barcode_data_dict, vector=False):
+        """vector=True 时用矢量图形绘制条形码，否则嵌入渲染好的位图；
+        选择了打印机分辨率时位图按该分辨率渲染，不再缩放"""
+        # 按A4纸 7列×16行 排版，布局参数见 Encoder/sheet.py
+        self.run_in_background(write_labels, file_path,
+                               list(barcode_data_dict.values()), vector,
+                               self.dpi_combo.currentData())
 
     def get_selected_items(self):
         """返回当前选中的所有条目"""
@@ -288,6 +396,9 @@ class BarcodeGenerator(QMainWindow):
     
     def delete_selected_items(self):
         """删除当前选中的所有条目"""
+        if self.list_mode:
+            self.delete_selected_rows()
+            return
         if not self.selected_items:
             QMessageBox.information(self, "提示", "请先选择要删除的条目")
             return
@@ -305,7 +416,9 @@ class BarcodeGenerator(QMainWindow):
             for item in self.selected_items[:]:  # 使用副本进行迭代，因为我们会修改原始列表
                 self.items_layout.removeWidget(item)
                 
-                del self.barcode_items[item.get_barcode_data()['itemID']]
+                del self.barcode_items[item.itemID]
+                # 已删除条目的数据不再导出
+                self.barcode_data_dict.pop(item.itemID, None)
                 item.deleteLater()
             
             # 清空选中列表
@@ -315,6 +428,120 @@ class BarcodeGenerator(QMainWindow):
             if not self.barcode_items:
                 self.add_barcode_item()
 
+    def delete_selected_rows(self):
+        """列表模式：删除视图中选中的行"""
+        rows = [index.row() for index in self.barcode_view.selectionModel().selectedRows()]
+        if not rows:
+            QMessageBox.information(self, "提示", "请先选择要删除的条目")
+            return
+        reply = QMessageBox.question(
+            self,
+            '确认',
+            f'确定要删除选中的 {len(rows)} 个条目吗？',
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.barcode_model.remove_rows(rows)
+            # 如果删除后没有条目了，添加一个空条目
+            if not self.barcode_model.rowCount():
+                self.barcode_model.append_entries([new_entry()])
+
+    def import_entries(self):
+        """从CSV或Excel表格批量导入条目，所有无效行在最后一次性提示"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "批量导入", "", "表格文件 (*.csv *.xlsx);;所有文件 (*.*)")
+        if not file_path:
+            return
+
+        entries = []
+        errors = []
+        try:
+            # 在后台逐行读取并按批校验校验位
+            self.run_in_background(read_entries, file_path, entries, errors)
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导入时出错: {str(e)}")
+            return
+        if entries:
+            self.add_entries(entries)
+
+        message = f"已导入 {len(entries)} 个条目"
+        if not errors:
+            QMessageBox.information(self, "导入完成", message)
+            return
+        errors.sort()
+        lines = [f"第 {line_no} 行: {error}"
+                 for line_no, error in errors[:max_reported_errors]]
+        if len(errors) > max_reported_errors:
+            lines.append("……")
+        QMessageBox.warning(self, "导入完成",
+                            f"{message}，跳过 {len(errors)} 行无效数据：\n" + "\n".join(lines))
+
+    def add_entries(self, entries):
+        """一次添加多个条目；只有一个空条目时先将其替换"""
+        if not self.list_mode and len(self.barcode_items) + len(entries) > list_mode_threshold:
+            # 条目太多时每条一个控件会很慢，改用列表模式
+            self.list_mode_checkbox.setChecked(True)
+
+        if self.list_mode:
+            model = self.barcode_model
+            if model.rowCount() == 1 and not (model.entries[0]['barcode_code'] or
+                                              model.entries[0]['style_code']):
+                model.set_entries(entries)
+            else:
+                model.append_entries(entries)
+            return
+
+        # 暂停重绘，所有控件加入后只排版一次
+        container = self.items_layout.parentWidget()
+        container.setUpdatesEnabled(False)
+        try:
+            if len(self.barcode_items) == 1:
+                item = next(iter(self.barcode_items.values()))
+                if not (item.code_input.text().strip() or item.style_input.text().strip()):
+                    self.items_layout.removeWidget(item)
+                    del self.barcode_items[item.itemID]
+                    item.deleteLater()
+            for entry in entries:
+                self.add_barcode_item()
+                item = self.barcode_items[self.itemIdentifier - 1]
+                item.style_input.setText(entry['style_code'])
+                item.code_input.setText(entry['barcode_code'])
+                item.quantity_input.setValue(entry['quantity'])
+        finally:
+            container.setUpdatesEnabled(True)
+
+    def set_list_mode(self, enabled):
+        """在每条一个控件和列表模式之间切换，条目内容原样保留"""
+        if enabled == self.list_mode:
+            return
+        if enabled:
+            entries = [new_entry(item.style_input.text().strip(),
+                                 item.code_input.text().strip(),
+                                 item.quantity_input.value())
+                       for item in self.barcode_items.values()]
+            for item in self.barcode_items.values():
+                self.items_layout.removeWidget(item)
+                item.deleteLater()
+            self.barcode_items.clear()
+            self.selected_items.clear()
+            self.barcode_data_dict.clear()
+            self.itemIdentifier = 0
+            self.barcode_model.set_entries(entries or [new_entry()])
+            self.list_mode = True
+            self.view_stack.setCurrentWidget(self.barcode_view)
+        else:
+            entries = self.barcode_model.entries
+            self.barcode_model.set_entries([])
+            self.list_mode = False
+            self.view_stack.setCurrentIndex(0)
+            for entry in entries or [new_entry()]:
+                self.add_barcode_item()
+                item = self.barcode_items[self.itemIdentifier - 1]
+                item.style_input.setText(entry['style_code'])
+                item.code_input.setText(entry['barcode_code'])
+                item.quantity_input.setValue(entry['quantity'])
+
     def set_application_icon(self):
         try:
             # 使用SVG图标
@@ -330,6 +557,54 @@ class BarcodeGenerator(QMainWindow):
             print(f"无法加载应用图标: {e}")
 
 
+def use_process_pool(count):
+    """要渲染 count 个不同条码时是否值得启动进程池：数量足够多且有多个CPU核"""
+    return count >= parallel_min_labels and (render_workers or os.cpu_count() or 1) > 1
+
+
+def render_labels(labels):
+    """把 labels 渲染进缓存：不同条码较多时使用进程池，否则逐条渲染"""
+    unique = {(v['barcode_code'], v['style_code']) for v in labels}
+    if use_process_pool(len(unique)):
+        try:
+            with make_executor(render_workers, start_method=render_start_method) as executor:
+                render_many(labels, executor, chunksize=render_chunksize)
+            return
+        except Exception as e:
+            # 并行渲染失败时退回逐条渲染
+            logger.warning("并行渲染失败，改为逐条渲染: %s", e, exc_info=True)
+    for code, style_code in unique:
+        render_sized_label(code, style_code)
+
+
+def read_entries(file_path, entries, errors):
+    """把表格中的有效行追加到 entries，无效行的 (行号, 原因) 追加到 errors"""
+    entries.extend(read_labels(file_path, errors, messages=import_messages))
+
+
+def write_labels(file_path, specs, vector=False, dpi=None):
+    """按 LabelSpec 列表写出标签PDF，图像在写入时按需渲染；渲染缓存中没有的
+    标签较多时用进程池边渲染边写入，进程池出错时记录日志并逐条渲染重写文件。
+    dpi 为打印机分辨率时标签按该分辨率渲染"""
+    if vector or dpi:
+        write_label_sheet(file_path, (spec.as_label() for spec in specs),
+                          vector=vector, dpi=dpi)
+        return
+    missing = {spec.key() for spec in specs if spec.key() not in render_cache}
+    if use_process_pool(len(missing)):
+        try:
+            # 渲染结果挂在临时字典上，写完一页即可释放
+            with make_executor(render_workers, start_method=render_start_method) as executor:
+                write_label_sheet(file_path,
+                                  render_stream((spec.as_label() for spec in specs),
+                                                executor, chunksize=render_chunksize))
+            return
+        except Exception as e:
+            # 如 BrokenProcessPool 或打包后无法启动子进程；写了一半的文件已被删除
+            logger.warning("并行渲染失败，改为逐条渲染: %s", e, exc_info=True)
+    write_label_sheet(file_path, (spec.as_label() for spec in specs))
+
+
 # 获取应用程序根目录的路径函数
 def resource_path(relative_path):
     """获取资源的绝对路径，兼容开发环境和PyInstaller打包后的环境"""
@@ -343,6 +618,7 @@ def resource_path(relative_path):
 
 # 在主函数中
 if __name__ == '__main__':
+    freeze_support()  # 打包后的程序启动渲染子进程时需要
     app = QApplication(sys.argv)
     
     # 设置字体大小
@@ -0,0 +1,111 @@
+"""在后台线程渲染条形码，结果通过Qt信号交回界面线程
+
+>>> task = RenderTask(request_id, code, style_code, preview_size=(500, 200))
+>>> task.signals.finished.connect(on_finished)
+>>> QThreadPool.globalInstance().start(task)
+
+每个任务带有发起时的请求编号，输入再次改变后旧任务可以被取消，
+已经完成的旧结果由接收方按编号丢弃。
+"""
+
+from PyQt5.QtCore import QObject, QRunnable, Qt, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from Encoder.label import render_sized_label
+
+
+def pil_to_qimage(image, copy=True):
+    """把PIL图像转换为QImage（灰度或RGB）
+
+    PIL 不公开其内部的像素存储，image.tobytes() 总会复制一次像素。
+    copy=False 时 QImage 直接包装这份 bytes，不再调用 QImage.copy() 复制
+    第二次；缓冲区由 QImage 引用，只读使用。预览只需缩放或转换为
+    QPixmap，两者都会生成新的数据，因此不必再复制。copy=True 返回拥有
+    独立数据的 QImage。"""
+    if image.mode == '1':
+        image = image.convert('L')
+    elif image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+    fmt = QImage.Format_Grayscale8 if image.mode == 'L' else QImage.Format_RGB888
+    bytes_per_line = image.width * len(image.getbands())
+    data = image.tobytes()
+    qimage = QImage(data, image.width, image.height, bytes_per_line, fmt)
+    if copy:
+        return qimage.copy()
+    # 保持缓冲区存活，直到 QImage 被释放
+    qimage.buffer = data
+    return qimage
+
+
+def preview_qimage(image, size):
+    """按比例缩放到 size 以内的预览 QImage：tobytes() 得到的像素直接
+    包装后缩放，原尺寸的像素只复制这一次，不经过 PNG 编码/解码"""
+    return pil_to_qimage(image, copy=False).scaled(*size, Qt.KeepAspectRatio,
+                                                   Qt.SmoothTransformation)
+
+
+class RenderSignals(QObject):
+    # 请求编号, PIL图像, 预览QImage
+    finished = pyqtSignal(int, object, object)
+    # 请求编号, 错误信息
+    failed = pyqtSignal(int, str)
+
+
+class RenderTask(QRunnable):
+    """渲染一个标签并生成缩放好的预览图；QImage 可以在非界面线程中
+    创建和缩放，界面线程只需转换为 QPixmap"""
+
+    def __init__(self, request_id, code, style_code, preview_size=None):
+        super().__init__()
+        self.request_id = request_id
+        self.code = code
+        self.style_code = style_code
+        self.preview_size = preview_size
+        self.cancelled = False
+        self.signals = RenderSignals()
+
+    def cancel(self):
+        """标记为已取消：尚未开始的任务不再渲染，已完成的不再发信号。
+        只修改 Python 属性，任务被线程池释放后调用也是安全的"""
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            image = render_sized_label(self.code, self.style_code)
+            if self.preview_size:
+                preview = preview_qimage(image, self.preview_size)
+            else:
+                preview = pil_to_qimage(image)
+        except Exception as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self.request_id, str(e))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self.request_id, image, preview)
+
+
+class FunctionSignals(QObject):
+    done = pyqtSignal()
+
+
+class FunctionTask(QRunnable):
+    """在线程池中执行一个函数，结束后发出 done 信号；函数抛出的异常
+    保存在 error 中，由调用方在界面线程处理"""
+
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.error = None
+        self.signals = FunctionSignals()
+
+    def run(self):
+        try:
+            self.function(*self.args, **self.kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.signals.done.emit()
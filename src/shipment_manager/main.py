@@ -2,7 +2,7 @@ import sys
 import os
 import datetime
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QLineEdit, QTableWidget, QTableWidgetItem, 
+                             QLabel, QLineEdit, QTableView, 
                              QPushButton, QHeaderView, QFormLayout, QFileDialog, 
                              QMessageBox, QMenu, QInputDialog, QAction, QScrollArea,
                              QFrame, QSizePolicy, QGridLayout)
@@ -10,6 +10,8 @@ from PyQt5.QtCore import Qt, QRectF, QSizeF, QMarginsF
 from PyQt5.QtPrintSupport import QPrinter
 from PyQt5.QtGui import QTextDocument, QPainter, QAbstractTextDocumentLayout
 
+from .note_model import DeliveryNoteModel, cents_to_decimal
+
 # --- 单个送货单控件 (容器) ---
 class SingleDeliveryNote(QWidget):
     def __init__(self, parent_area, index):
@@ -19,7 +21,7 @@ class SingleDeliveryNote(QWidget):
         self.is_collapsed = False
         
         self.init_ui()
-        self.calculate_totals() # 初始计算
+        self.show_totals() # 初始显示
 
     def init_ui(self):
         # 外层边框布局
@@ -115,15 +117,16 @@ class SingleDeliveryNote(QWidget):
         self.content_layout.addLayout(header_grid)
 
         # --- 表格区域 ---
-        self.table = QTableWidget()
+        self.table = QTableView()
         self.table.setStyleSheet("""
-            QTableWidget { font-size: 18px; border: 1px solid #ccc; } 
+            QTableView { font-size: 18px; border: 1px solid #ccc; } 
             QHeaderView::section { font-size: 18px; font-weight: bold; padding: 5px; height: 40px; background-color: #f0f0f0; }
         """)
         
         self.columns = ['货号', '名称', '规格', '单位', '数量', '单价', '金额', '备注']
-        self.table.setColumnCount(len(self.columns))
-        self.table.setHorizontalHeaderLabels(self.columns)
+        # 数据保存在模型中，不再为每个单元格创建 QTableWidgetItem
+        self.model = DeliveryNoteModel(self.columns, self)
+        self.table.setModel(self.model)
         self.table.verticalHeader().setVisible(False)
 
         # 表头右键菜单
@@ -151,11 +154,8 @@ class SingleDeliveryNote(QWidget):
             ['黑色签字笔', '0.5mm', '支', 50, 2.5, ''],
             ['透明胶带', '4.5cm宽', '卷', 20, 5, '']
         ]
-        for row_data in initial_data:
-            self.add_row(data=row_data)
-
-        self.add_row() # 空行
-        self.table.itemChanged.connect(self.on_item_changed)
+        # 一次性填入，最后一行为空行
+        self.model.set_rows([self.row_record(d) for d in initial_data] + [{}])
         self.content_layout.addWidget(self.table)
         
         # --- 按钮栏 ---
@@ -180,6 +180,7 @@ class SingleDeliveryNote(QWidget):
         total_layout.addStretch()
         total_layout.addWidget(self.lbl_num_total)
         self.content_layout.addLayout(total_layout)
+        self.model.total_changed.connect(self.show_totals)
 
         # --- 底部签名 ---
         footer_layout = QHBoxLayout()
@@ -226,43 +227,12 @@ class SingleDeliveryNote(QWidget):
         menu.exec_(self.table.mapToGlobal(pos))
 
     def delete_row_at(self, row):
-        """删除指定行并重新计算"""
-        self.table.removeRow(row)
-        # 重新排序号
-        for r in range(self.table.rowCount()):
-            item = self.table.item(r, 0)
-            if item:
-                item.setText(str(r + 1))
-        self.calculate_totals() # 重新计算总价
+        """删除指定行，总价减去这一行的金额"""
+        self.model.remove_rows(row)
 
     def insert_row_at(self, row):
-        """在指定位置插入行"""
-        self.table.insertRow(row)
-        # 填充序号和只读属性
-        item_idx = QTableWidgetItem(str(row + 1))
-        item_idx.setFlags(item_idx.flags() ^ Qt.ItemIsEditable)
-        item_idx.setTextAlignment(Qt.AlignCenter)
-        self.table.setItem(row, 0, item_idx)
-
-        # 重新排序号 (因为插入点之后的序号变了)
-        for r in range(row, self.table.rowCount()):
-             item = self.table.item(r, 0)
-             if not item:
-                 # 防止刚插入的行还没item的情况（虽然上面set了）
-                 item_idx_new = QTableWidgetItem(str(r + 1))
-                 item_idx_new.setFlags(item_idx_new.flags() ^ Qt.ItemIsEditable)
-                 item_idx_new.setTextAlignment(Qt.AlignCenter)
-                 self.table.setItem(r, 0, item_idx_new)
-             else:
-                 item.setText(str(r + 1))
-        
-        # 确保金额列不可编辑
-        headers = [self.table.horizontalHeaderItem(c).text() for c in range(self.table.columnCount())]
-        if "金额" in headers:
-            idx_amt = headers.index("金额")
-            item_amt = QTableWidgetItem("0.00")
-            item_amt.setFlags(item_amt.flags() ^ Qt.ItemIsEditable)
-            self.table.setItem(row, idx_amt, item_amt)
+        """在指定位置插入空行"""
+        self.model.insert_rows(row, [{}])
 
     # --- 逻辑方法 (表头菜单 - 复用) ---
     def show_header_menu(self, pos):
@@ -282,20 +252,18 @@ class SingleDeliveryNote(QWidget):
         menu.exec_(self.table.mapToGlobal(pos))
 
     def insert_column_at(self, index):
-        self.table.insertColumn(index)
-        self.table.setHorizontalHeaderItem(index, QTableWidgetItem("新列"))
+        self.model.insert_column(index, "新列")
         self.refresh_header_mode()
 
     def delete_column_at(self, index):
-        if self.table.columnCount() <= 1: return
-        self.table.removeColumn(index)
+        if self.model.columnCount() <= 1: return
+        self.model.remove_column(index)
 
     def rename_column_at(self, index):
-        old_text = self.table.horizontalHeaderItem(index).text()
+        old_text = self.model.headerData(index, Qt.Horizontal)
         new_text, ok = QInputDialog.getText(self, "修改表头", "请输入新列名:", text=old_text)
         if ok and new_text:
-            self.table.horizontalHeaderItem(index).setText(new_text)
-            self.on_item_changed(None)
+            self.model.rename_column(index, new_text)
 
     def refresh_header_mode(self):
         header = self.table.horizontalHeader()
@@ -303,88 +271,22 @@ class SingleDeliveryNote(QWidget):
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
 
     def add_column(self):
-        self.insert_column_at(self.table.columnCount())
+        self.insert_column_at(self.model.columnCount())
+
+    def row_record(self, data):
+        """把 [名称, 规格, 单位, 数量, 单价, 备注] 转成 {列名: 值}"""
+        names = ["名称", "规格", "单位", "数量", "单价", "备注"]
+        if self.model.column_index("名称") is None:
+            # 没有名称列时，名称放在第二列
+            if self.model.columnCount() <= 1: return {}
+            return {self.model.headers()[1]: data[0]}
+        return dict(zip(names, data))
 
     def add_row(self, data=None):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        item_idx = QTableWidgetItem(str(row + 1))
-        item_idx.setFlags(item_idx.flags() ^ Qt.ItemIsEditable)
-        item_idx.setTextAlignment(Qt.AlignCenter)
-        self.table.setItem(row, 0, item_idx)
-        
-        headers = [self.table.horizontalHeaderItem(c).text() for c in range(self.table.columnCount())]
-        name = data[0] if data else ""
-        spec = data[1] if data else ""
-        unit = data[2] if data else ""
-        qty  = str(data[3]) if data and len(data)>3 else "0"
-        price = str(data[4]) if data and len(data)>4 else "0"
-        remark = data[5] if data and len(data)>5 else ""
-
-        def set_cell(col_name, val):
-            if col_name in headers:
-                self.table.setItem(row, headers.index(col_name), QTableWidgetItem(val))
-
-        if "名称" in headers:
-            set_cell("名称", name)
-            set_cell("规格", spec)
-            set_cell("单位", unit)
-            set_cell("数量", qty)
-            set_cell("单价", price)
-            set_cell("备注", remark)
-        else:
-            if self.table.columnCount() > 1: self.table.setItem(row, 1, QTableWidgetItem(name))
-        
-        if "金额" in headers:
-            idx = headers.index("金额")
-            item_amt = QTableWidgetItem("0.00")
-            item_amt.setFlags(item_amt.flags() ^ Qt.ItemIsEditable)
-            self.table.setItem(row, idx, item_amt)
-        
-        self.calculate_row(row)
-
-    def on_item_changed(self, item):
-        if item is None: return
-        headers = [self.table.horizontalHeaderItem(c).text() for c in range(self.table.columnCount())]
-        if "数量" in headers and "单价" in headers:
-            idx_qty = headers.index("数量")
-            idx_price = headers.index("单价")
-            if item.column() == idx_qty or item.column() == idx_price:
-                self.calculate_row(item.row())
-                self.calculate_totals()
-
-    def calculate_row(self, row):
-        headers = [self.table.horizontalHeaderItem(c).text() for c in range(self.table.columnCount())]
-        if "数量" not in headers or "单价" not in headers or "金额" not in headers: return
-        idx_qty = headers.index("数量")
-        idx_price = headers.index("单价")
-        idx_amt = headers.index("金额")
-        try:
-            self.table.blockSignals(True)
-            qty_item = self.table.item(row, idx_qty)
-            price_item = self.table.item(row, idx_price)
-            qty = float(qty_item.text()) if qty_item and qty_item.text() else 0
-            price = float(price_item.text()) if price_item and price_item.text() else 0
-            amount = qty * price
-            amt_item = self.table.item(row, idx_amt)
-            if amt_item is None:
-                amt_item = QTableWidgetItem("0.00")
-                amt_item.setFlags(amt_item.flags() ^ Qt.ItemIsEditable)
-                self.table.setItem(row, idx_amt, amt_item)
-            amt_item.setText(f"{amount:.2f}")
-        except ValueError: pass
-        finally: self.table.blockSignals(False)
-
-    def calculate_totals(self):
-        headers = [self.table.horizontalHeaderItem(c).text() for c in range(self.table.columnCount())]
-        if "金额" not in headers: return
-        idx_amt = headers.index("金额")
-        total = 0.0
-        for row in range(self.table.rowCount()):
-            try:
-                item = self.table.item(row, idx_amt)
-                if item: total += float(item.text())
-            except ValueError: pass
+        self.model.insert_rows(self.model.rowCount(), [self.row_record(data) if data else {}])
+
+    def show_totals(self):
+        total = cents_to_decimal(self.model.total_cents)
         self.lbl_num_total.setText(f"总金额: {total:.2f}")
         self.lbl_chinese_total.setText(f"合计(大写): {self.digit_to_chinese(total)}")
 
@@ -422,7 +324,7 @@ class SingleDeliveryNote(QWidget):
     # --- HTML 生成逻辑 ---
     def generate_html(self):
         """生成本送货单的 HTML 代码片段"""
-        headers = [self.table.horizontalHeaderItem(c).text() for c in range(self.table.columnCount())]
+        headers = self.model.headers()
         
         # --- 1. 生成动态表头 ---
         header_html = "<tr>"
@@ -446,11 +348,10 @@ class SingleDeliveryNote(QWidget):
 
         # --- 2. 生成动态内容 ---
         rows_html = ""
-        for r in range(self.table.rowCount()):
+        for r in range(self.model.rowCount()):
             rows_html += "<tr>"
-            for c in range(self.table.columnCount()):
-                item = self.table.item(r, c)
-                text = item.text() if item else ""
+            for c in range(self.model.columnCount()):
+                text = self.model.text(r, c)
                 # 判断是否是产品名称列（通常是第2列，索引为1）
                 col_name = headers[c] if c < len(headers) else ""
                 if "产品名称" in col_name or "名称" in col_name:
@@ -0,0 +1,294 @@
+"""送货单表格：QAbstractTableModel + QTableView
+
+表格数据按列保存，不再为每个单元格创建一个 QTableWidgetItem：文字列
+是字符串列表，数量和单价是定点整数数组 (array('q'))。金额和序号不保
+存，在 data() 中由同一行的数量 × 单价、行号算出，插入或删除一行不会
+改写其它行。插入、删除多行时每个操作只通知视图一次，几千行的月结单
+也能流畅编辑和滚动。
+
+数量和单价保留 4 位小数，金额四舍五入到分，总价以整数“分”累加，编辑
+一个单元格只按这一行金额的差值更新总价。
+"""
+
+from array import array
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+# 列的类型
+TEXT = "text"              # 任意文字
+NUMBER = "number"          # 数量、单价：定点整数
+AMOUNT = "amount"          # 金额：数量 × 单价，不保存
+ROW_NUMBER = "row_number"  # 序号：行号 + 1，不保存，固定为最初的第一列
+
+QUANTITY_COLUMN = "数量"
+PRICE_COLUMN = "单价"
+AMOUNT_COLUMN = "金额"
+
+# 数量和单价以“万分之一”为单位保存
+FIXED_DIGITS = 4
+_fixed_step = Decimal(1).scaleb(-FIXED_DIGITS)
+_fixed_range = (-(1 << 63), 1 << 63)  # array('q') 能保存的范围
+
+# 数量 × 单价 的单位是 1e-8，换算成分要除以的数
+_cent_divisor = 10 ** (2 * FIXED_DIGITS - 2)
+
+
+def column_kind(name):
+    """按列名决定列的类型"""
+    if name in (QUANTITY_COLUMN, PRICE_COLUMN):
+        return NUMBER
+    if name == AMOUNT_COLUMN:
+        return AMOUNT
+    return TEXT
+
+
+def parse_number(text):
+    """把单元格文字解析为 Decimal，空白为 0；无法解析时抛出 InvalidOperation"""
+    text = text.strip()
+    return Decimal(text) if text else Decimal(0)
+
+
+def to_fixed(text):
+    """把单元格文字解析为定点整数，四舍五入到 4 位小数；无法解析、不是
+    有限的数（nan、inf）或超出范围时抛出 InvalidOperation"""
+    number = parse_number(text)
+    if not number.is_finite():
+        raise InvalidOperation(text)
+    value = int(number.quantize(_fixed_step, rounding=ROUND_HALF_UP)
+                .scaleb(FIXED_DIGITS))
+    if not _fixed_range[0] <= value < _fixed_range[1]:
+        raise InvalidOperation(text)
+    return value
+
+
+def fixed_or_zero(value):
+    try:
+        return to_fixed(str(value))
+    except (InvalidOperation, ValueError):
+        return 0
+
+
+def format_fixed(value):
+    """定点整数转成文字，去掉末尾的 0，如 25000 -> '2.5'"""
+    text = f"{Decimal(value).scaleb(-FIXED_DIGITS):f}"
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+def amount_cents(quantity, price):
+    """定点的数量 × 单价，四舍五入到分（与 ROUND_HALF_UP 相同）"""
+    product = quantity * price
+    cents = (abs(product) + _cent_divisor // 2) // _cent_divisor
+    return -cents if product < 0 else cents
+
+
+def cents_to_decimal(cents):
+    return Decimal(cents).scaleb(-2)
+
+
+def new_values(kind, texts):
+    """按列的类型保存一列文字"""
+    if kind == TEXT:
+        return list(texts)
+    if kind == NUMBER:
+        return array("q", (fixed_or_zero(text) for text in texts))
+    return None  # 金额和序号不保存
+
+
+class NoteColumn:
+    """一列：列名、类型和按行保存的值"""
+
+    __slots__ = ("name", "kind", "values")
+
+    def __init__(self, name, kind, rows=0):
+        self.name = name
+        self.kind = kind
+        self.values = new_values(kind, [""] * rows)
+
+
+class DeliveryNoteModel(QAbstractTableModel):
+    """送货单表格数据。第一列是序号，列名为数量、单价、金额的列参与计算，
+    其余列保存文字。total_cents 是所有行金额之和。"""
+
+    total_changed = pyqtSignal()
+
+    def __init__(self, names, parent=None):
+        super().__init__(parent)
+        self.columns = [NoteColumn(names[0], ROW_NUMBER)]
+        self.columns += [NoteColumn(name, column_kind(name)) for name in names[1:]]
+        self.row_count = 0
+        self.total_cents = 0
+        self._index = None  # 列名 -> 列号，增删或改名列时失效
+
+    # --- Qt 模型接口 ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.columns[section].name
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.text(index.row(), index.column())
+        if role == Qt.TextAlignmentRole and self.columns[index.column()].kind == ROW_NUMBER:
+            return Qt.AlignCenter
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        row = index.row()
+        column = self.columns[index.column()]
+        if column.kind == TEXT:
+            column.values[row] = str(value)
+            self.dataChanged.emit(index, index)
+            return True
+        if column.kind != NUMBER:
+            return False
+        try:
+            value = to_fixed(str(value))
+        except (InvalidOperation, ValueError):
+            return False  # 不是数字时保留原值
+        old_amount = self.amount_cents(row)
+        column.values[row] = value
+        self.dataChanged.emit(index, index)
+        amount = self.amount_cents(row)
+        if amount != old_amount:
+            # 总价只加上这一行的差值
+            self.total_cents += amount - old_amount
+            col = self.column_index(AMOUNT_COLUMN)
+            self.dataChanged.emit(self.index(row, col), self.index(row, col))
+            self.total_changed.emit()
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if self.columns[index.column()].kind in (TEXT, NUMBER):
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    # --- 读取 ---
+    def headers(self):
+        return [column.name for column in self.columns]
+
+    def column_index(self, name):
+        """列名对应的列号（同名时取最左边一列），没有这一列时返回 None。
+        序号列即使改名为数量、单价或金额也不参与计算，不会被找到"""
+        if self._index is None:
+            self._index = {}
+            for col, column in enumerate(self.columns):
+                if column.kind == ROW_NUMBER and column_kind(column.name) != TEXT:
+                    continue
+                self._index.setdefault(column.name, col)
+        return self._index.get(name)
+
+    def amount_cents(self, row):
+        """第 row 行的金额（分）；缺少数量、单价或金额列时为 0"""
+        qty = self.column_index(QUANTITY_COLUMN)
+        price = self.column_index(PRICE_COLUMN)
+        if qty is None or price is None or self.column_index(AMOUNT_COLUMN) is None:
+            return 0
+        return amount_cents(self.columns[qty].values[row],
+                            self.columns[price].values[row])
+
+    def text(self, row, col):
+        """单元格显示的文字"""
+        column = self.columns[col]
+        if column.kind == AMOUNT:
+            return f"{cents_to_decimal(self.amount_cents(row)):.2f}"
+        if column.kind == NUMBER:
+            return format_fixed(column.values[row])
+        if column.kind == ROW_NUMBER:
+            return str(row + 1)
+        return column.values[row]
+
+    # --- 行操作 ---
+    def set_rows(self, records):
+        """替换全部行，每行是 {列名: 值} 字典，缺少的列为空或 0"""
+        records = list(records)
+        self.beginResetModel()
+        for column in self.columns:
+            column.values = new_values(column.kind, [])
+        self.row_count = 0
+        self._fill_rows(0, records)
+        self.endResetModel()
+        self._update_total()
+
+    def insert_rows(self, row, records):
+        """在第 row 行前插入多行，视图只收到一次通知"""
+        records = list(records)
+        if not records:
+            return
+        self.beginInsertRows(QModelIndex(), row, row + len(records) - 1)
+        self._fill_rows(row, records)
+        self.endInsertRows()
+        self.total_cents += sum(self.amount_cents(r) for r in range(row, row + len(records)))
+        self.total_changed.emit()
+
+    def remove_rows(self, row, count=1):
+        """删除从第 row 行开始的 count 行"""
+        count = min(count, self.row_count - row)
+        if count <= 0:
+            return
+        self.total_cents -= sum(self.amount_cents(r) for r in range(row, row + count))
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        for column in self.columns:
+            if column.values is not None:
+                del column.values[row:row + count]
+        self.row_count -= count
+        self.endRemoveRows()
+        self.total_changed.emit()
+
+    def _fill_rows(self, row, records):
+        for column in self.columns:
+            if column.kind == TEXT:
+                column.values[row:row] = [str(r.get(column.name, "")) for r in records]
+            elif column.kind == NUMBER:
+                column.values[row:row] = array("q", (fixed_or_zero(r.get(column.name, 0))
+                                                     for r in records))
+        self.row_count += len(records)
+
+    def _update_total(self):
+        """逐行重新统计总价，只在替换全部行或列变化时需要"""
+        self.total_cents = sum(self.amount_cents(r) for r in range(self.row_count))
+        self.total_changed.emit()
+
+    # --- 列操作 ---
+    def insert_column(self, col, name):
+        self.beginInsertColumns(QModelIndex(), col, col)
+        self.columns.insert(col, NoteColumn(name, column_kind(name), self.row_count))
+        self._index = None
+        self.endInsertColumns()
+        self._update_total()
+
+    def remove_column(self, col):
+        self.beginRemoveColumns(QModelIndex(), col, col)
+        del self.columns[col]
+        self._index = None
+        self.endRemoveColumns()
+        self._update_total()
+
+    def rename_column(self, col, name):
+        """修改列名；改成或改掉数量、单价、金额时，这一列按显示的文字转换类型"""
+        column = self.columns[col]
+        kind = column.kind if column.kind == ROW_NUMBER else column_kind(name)
+        if kind != column.kind:
+            column.values = new_values(kind, [self.text(r, col) for r in range(self.row_count)])
+            column.kind = kind
+        column.name = name
+        self._index = None
+        self._update_total()
+        self.headerDataChanged.emit(Qt.Horizontal, col, col)
+        if self.row_count:
+            # 其它列的金额也可能随之改变
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(self.row_count - 1, len(self.columns) - 1))
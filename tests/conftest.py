@@ -0,0 +1,36 @@
+"""Shared fixtures: the repository root and src/ on sys.path, and a
+check for the label font"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "src")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def font():
+    """Skip tests that draw digits when arial.ttf cannot be loaded, from
+    the working directory or the system font folders"""
+    from PIL import ImageFont
+
+    from Encoder.fonts import DEFAULT_FONT
+    try:
+        ImageFont.truetype(DEFAULT_FONT, 10)
+    except OSError:
+        pytest.skip("%s is not available" % DEFAULT_FONT)
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """A QApplication for tests of the GUI models, on the offscreen
+    platform so that no display is needed"""
+    pytest.importorskip("PyQt5")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
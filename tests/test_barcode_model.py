@@ -0,0 +1,64 @@
+"""The list-mode model repaints only the rows waiting for a thumbnail"""
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from PyQt5.QtGui import QImage
+
+from barcode_generator import barcode_model
+from barcode_generator.barcode_model import BarcodeListModel, PreviewRole, new_entry
+
+
+class IdlePool:
+    """Stands in for the global thread pool; tasks are never run"""
+
+    def start(self, task):
+        pass
+
+
+@pytest.fixture
+def model(qapp, monkeypatch):
+    monkeypatch.setattr(barcode_model.QThreadPool, "globalInstance",
+                        staticmethod(lambda: IdlePool()))
+    model = BarcodeListModel()
+    # 500 distinct labels, each shown in 4 rows
+    model.append_entries(new_entry("S%d" % (i % 500), "6900000%05d" % (i % 500))
+                         for i in range(2000))
+    changed = []
+    model.dataChanged.connect(lambda first, last, roles: changed.extend(
+        range(first.row(), last.row() + 1)))
+    model.changed = changed
+    return model
+
+
+def finish(model, row):
+    """Deliver the thumbnail requested for row"""
+    entry = model.entries[row]
+    request_id = model._pending_keys[(entry['barcode_code'], entry['style_code'])]
+    preview = QImage(8, 4, QImage.Format_Grayscale8)
+    model._on_thumbnail_finished(request_id, None, preview)
+
+
+def test_finished_thumbnail_updates_only_painted_rows(model):
+    for row in (3, 503, 1503):
+        assert model.data(model.index(row), PreviewRole) is None
+    assert len(model._pending) == 1  # one render for all three rows
+    finish(model, 3)
+    assert model.changed == [3, 503, 1503]
+    assert model.data(model.index(1003), PreviewRole) is not None
+
+
+def test_rows_that_changed_meanwhile_are_skipped(model):
+    model.data(model.index(3), PreviewRole)
+    model.data(model.index(4), PreviewRole)
+    model.remove_rows([0])  # the waiting rows now show other entries
+    finish(model, 2)
+    assert model.changed == []
+
+
+def test_failed_thumbnail_forgets_its_rows(model):
+    model.data(model.index(3), PreviewRole)
+    request_id = next(iter(model._pending))
+    model._on_thumbnail_failed(request_id, "error")
+    assert not model._pending and not model._waiting_rows
@@ -0,0 +1,122 @@
+"""The batch CLI reads and validates rows like the GUI and never leaves a
+partial PDF behind"""
+
+import json
+
+import pytest
+
+from Encoder.batch import MESSAGES, RowError, main, make_label, read_labels
+from Encoder.sheet import LabelSheetWriter
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_make_label():
+    assert make_label({'style_code': ' A1 ', 'code': '690123456789',
+                       'quantity': '3'}) == \
+        {'style_code': 'A1', 'barcode_code': '690123456789', 'quantity': 3}
+    # Chinese column names, quantity defaulting to 1, JSON lines
+    assert make_label({'款号': 'B2', '条形码编号': '6901234567892'})['quantity'] == 1
+    assert make_label(json.dumps({'code': '690123456789'}))['style_code'] == ''
+
+
+@pytest.mark.parametrize("row", [
+    {'code': '12345'}, {'code': '69012345678901'}, {'code': '6901234567x9'},
+    {'code': '69012345678²'}, {'code': '690123456789', 'quantity': '0'},
+    {'code': '690123456789', 'quantity': 'many'}, {},
+])
+def test_make_label_rejects_bad_rows(row):
+    with pytest.raises(ValueError):
+        make_label(row)
+
+
+def test_read_labels_reports_bad_rows(tmp_path):
+    path = write(tmp_path / "labels.csv",
+                 "style_code,code,quantity\n"
+                 "A1,690123456789,2\n"
+                 "A2,6901234567890,1\n"    # wrong check digit
+                 "A3,123,1\n"
+                 "A4,6901234567892,5\n")
+    errors = []
+    labels = list(read_labels(path, errors, chunk_size=2))
+    assert [label['style_code'] for label in labels] == ["A1", "A4"]
+    assert sorted(line_no for line_no, _ in errors) == [3, 4]
+
+
+def test_read_labels_jsonl(tmp_path):
+    path = write(tmp_path / "labels.jsonl",
+                 '{"style_code": "A1", "code": "690123456789"}\n\n'
+                 'not json\n')
+    errors = []
+    assert len(list(read_labels(path, errors))) == 1
+    assert [line_no for line_no, _ in errors] == [3]
+
+
+def test_missing_input_creates_no_output(tmp_path, capsys):
+    pdf = tmp_path / "labels.pdf"
+    assert main([str(tmp_path / "missing.csv"), "--pdf", str(pdf)]) == 2
+    assert not pdf.exists()
+    assert "missing.csv" in capsys.readouterr().err
+
+
+def test_vector_batch_writes_pdf(tmp_path):
+    path = write(tmp_path / "labels.csv", "款号,条形码编号,数量\nA1,690123456789,3\n")
+    pdf = tmp_path / "labels.pdf"
+    assert main([path, "--pdf", str(pdf), "--vector"]) == 0
+    assert pdf.read_bytes().endswith(b"%%EOF\n")
+
+
+def test_failed_sheet_is_deleted(tmp_path):
+    pdf = tmp_path / "labels.pdf"
+    with pytest.raises(RuntimeError):
+        with LabelSheetWriter(str(pdf), vector=True) as sheet:
+            sheet.add({'style_code': '', 'barcode_code': '690123456789',
+                       'quantity': 1})
+            raise RuntimeError("input failed")
+    assert not pdf.exists()
+
+
+def test_full_width_codes_are_read_as_ascii():
+    label = make_label({'code': '６９０１２３４５６７８９', 'quantity': '２'})
+    assert label['barcode_code'] == '690123456789'
+    assert label['quantity'] == 2
+
+
+@pytest.mark.parametrize("row, key", [
+    ('[1, 2]', "bad_row"), ('not json', "bad_row"),
+    ({'code': '123'}, "bad_code"),
+    ({'code': '690123456789', 'quantity': '2.5'}, "bad_quantity"),
+    ({'code': '690123456789', 'quantity': '-1'}, "low_quantity"),
+])
+def test_make_label_error_keys(row, key):
+    with pytest.raises(RowError) as info:
+        make_label(row)
+    assert info.value.key == key
+    assert str(info.value) == info.value.message(MESSAGES)
+
+
+def test_read_labels_uses_the_given_messages(tmp_path):
+    path = write(tmp_path / "labels.csv",
+                 "款号,条形码编号,数量\n"
+                 "A1,６９０１２３４５６７８９,1\n"
+                 "A2,6901234567890,1\n"
+                 "A3,690123456789,x\n")
+    messages = {key: "<%s>" % key + " %s" * template.count("%")
+                for key, template in MESSAGES.items()}
+    errors = []
+    labels = list(read_labels(path, errors, messages=messages))
+    assert [label['barcode_code'] for label in labels] == ['690123456789']
+    assert sorted(errors) == [(3, "<check_digit> 6901234567890 2"),
+                              (4, "<bad_quantity> x")]
+
+
+def test_gui_messages_cover_every_error(qapp):
+    pytest.importorskip("PyQt5.QtSvg")
+    from barcode_generator.main import import_messages
+
+    assert import_messages.keys() == MESSAGES.keys()
+    for key, template in MESSAGES.items():
+        assert import_messages[key].count("%") == template.count("%")
@@ -0,0 +1,67 @@
+"""RenderCache stays within its byte budget, evicting the least
+recently used images"""
+
+from PIL import Image
+
+from Encoder.cache import RenderCache, image_nbytes
+
+
+def image(width, height=10, mode="L"):
+    return Image.new(mode, (width, height), 255)
+
+
+def test_image_nbytes():
+    assert image_nbytes(image(30)) == 300
+    assert image_nbytes(image(30, mode="1")) == 40
+    assert image_nbytes(image(30, mode="RGB")) == 900
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = RenderCache(max_bytes=1000)
+    for key in "abc":
+        cache.put(key, image(30))  # 300 bytes each
+    assert cache.current_bytes == 900
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("d", image(30))
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert cache.current_bytes == 900 <= cache.max_bytes
+
+
+def test_replacing_an_entry_counts_its_size_once():
+    cache = RenderCache(max_bytes=1000)
+    cache.put("a", image(30))
+    cache.put("a", image(50))
+    assert len(cache) == 1
+    assert cache.current_bytes == 500
+
+
+def test_oversized_images_are_not_kept():
+    cache = RenderCache(max_bytes=100)
+    cache.put("a", image(30))
+    assert "a" not in cache
+    assert cache.current_bytes == 0
+
+
+def test_lowering_the_budget_evicts():
+    cache = RenderCache(max_bytes=1000)
+    for key in "abc":
+        cache.put(key, image(30))
+    cache.max_bytes = 400
+    assert list(key for key in "abc" if key in cache) == ["c"]
+    assert cache.current_bytes == 300
+
+
+def test_get_or_render_counts_hits_and_misses():
+    cache = RenderCache()
+    calls = []
+
+    def render():
+        calls.append(1)
+        return image(10)
+
+    first = cache.get_or_render("a", render)
+    second = cache.get_or_render("a", render)
+    assert first is second
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
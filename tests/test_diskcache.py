@@ -0,0 +1,89 @@
+"""Disk cache entries decode to exactly the stored image"""
+
+import os
+
+import numpy as np
+from PIL import Image
+
+from Encoder.cache import RenderCache
+from Encoder.diskcache import DiskCache, decode_image, encode_image
+
+
+def label_like(width=131, height=60, seed=0):
+    """Black and white image with a few grey edge pixels, like a label"""
+    rng = np.random.default_rng(seed)
+    pixels = np.where(rng.random((height, width)) < 0.5, 0, 255).astype(np.uint8)
+    grey = rng.random((height, width)) < 0.05
+    pixels[grey] = rng.integers(1, 255, grey.sum(), dtype=np.uint8)
+    return Image.fromarray(pixels, "L")
+
+
+def test_round_trip_is_lossless():
+    for width in (1, 7, 8, 9, 131):
+        original = label_like(width)
+        decoded = decode_image(encode_image(original))
+        assert decoded.mode == "L"
+        assert decoded.size == original.size
+        assert decoded.tobytes() == original.tobytes()
+
+
+def test_get_returns_stored_image(tmp_path):
+    cache = DiskCache(str(tmp_path), version="1")
+    original = label_like()
+    assert cache.get(("690123456789", "A1")) is None
+    cache.put(("690123456789", "A1"), original)
+    assert cache.get(("690123456789", "A1")).tobytes() == original.tobytes()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_version_separates_entries(tmp_path):
+    DiskCache(str(tmp_path), version="1").put("key", label_like())
+    assert DiskCache(str(tmp_path), version="2").get("key") is None
+
+
+def test_damaged_entry_is_a_miss(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.put("key", label_like())
+    with open(cache.path("key"), "r+b") as f:
+        f.truncate(10)
+    assert cache.get("key") is None
+
+
+def test_evicts_oldest_files_over_budget(tmp_path):
+    entry_size = len(encode_image(label_like()))
+    cache = DiskCache(str(tmp_path), max_bytes=entry_size * 3)
+    for i in range(5):
+        cache.put(i, label_like(seed=i))
+        # distinct modification times, oldest first
+        os.utime(cache.path(i), (i, i))
+    sizes = [entry.stat().st_size for folder in os.scandir(str(tmp_path))
+             for entry in os.scandir(folder.path)]
+    assert sum(sizes) <= entry_size * 3
+    assert cache.get(4) is not None
+    assert cache.get(0) is None
+
+
+def test_render_cache_reads_through_to_disk(tmp_path):
+    original = label_like()
+    writer = RenderCache()
+    writer.disk = DiskCache(str(tmp_path))
+    writer.put("key", original)
+
+    reader = RenderCache()
+    reader.disk = DiskCache(str(tmp_path))
+    assert reader.get("key").tobytes() == original.tobytes()
+    assert "key" in reader
+
+
+def test_disk_cache_is_opt_in(tmp_path):
+    from Encoder.cache import render_cache
+    from Encoder.label import RENDER_VERSION, disable_disk_cache, enable_disk_cache
+
+    assert render_cache.disk is None  # nothing is written unless asked
+    try:
+        disk = enable_disk_cache(str(tmp_path), max_bytes=1 << 20)
+        assert render_cache.disk is disk
+        assert disk.version.startswith("%d/" % RENDER_VERSION)
+    finally:
+        disable_disk_cache()
+    assert render_cache.disk is None
@@ -0,0 +1,51 @@
+"""validate_gtins and check_digits must agree with the scalar
+Modulo-10 calculation"""
+
+import random
+
+import numpy as np
+
+from Encoder import EAN13Encoder
+from Encoder.gtin import check_digits, validate_gtins
+
+
+def scalar_check_digit(body):
+    """Check digit of a GTIN given without it, weighting 3, 1, 3, ...
+    from the right"""
+    total = sum(int(digit) * (3 if i % 2 == 0 else 1)
+                for i, digit in enumerate(reversed(body)))
+    return -total % 10
+
+
+def random_bodies(seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice("0123456789") for _ in range(length))
+            for length in (7, 11, 12, 13) for _ in range(200)]
+
+
+def test_check_digits_match_scalar():
+    bodies = random_bodies()
+    expected = [scalar_check_digit(body) for body in bodies]
+    assert check_digits(bodies).tolist() == expected
+
+
+def test_check_digits_match_encoder():
+    bodies = [body for body in random_bodies(1) if len(body) == 12]
+    expected = [EAN13Encoder(body).check_digit for body in bodies]
+    assert check_digits(bodies).tolist() == expected
+
+
+def test_validate_gtins():
+    bodies = random_bodies(2)
+    good = [body + str(scalar_check_digit(body)) for body in bodies]
+    bad = [body + str((scalar_check_digit(body) + 1) % 10) for body in bodies]
+    result = validate_gtins(good + bad)
+    assert result.valid.tolist() == [True] * len(good) + [False] * len(bad)
+    assert np.array_equal(result.check_digits[:len(good)],
+                          result.check_digits[len(good):])
+
+
+def test_malformed_codes():
+    result = validate_gtins(["12345", "", "40063813339a1", "4006381333931"])
+    assert result.valid.tolist() == [False, False, False, True]
+    assert result.check_digits.tolist()[:3] == [-1, -1, -1]
@@ -0,0 +1,59 @@
+"""PDF export from the barcode generator window falls back to rendering
+one label at a time when the process pool fails"""
+
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+pytest.importorskip("PyQt5.QtSvg")
+
+from barcode_generator import main as gui
+from Encoder.cache import render_cache
+from Encoder.label import LabelSpec
+
+
+class BrokenExecutor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, *args, **kwargs):
+        raise BrokenProcessPool("worker died")
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(gui, "parallel_min_labels", 2)
+    monkeypatch.setattr(gui, "render_workers", 2)
+    render_cache.clear()
+    yield
+    render_cache.clear()
+
+
+def test_use_process_pool(monkeypatch):
+    monkeypatch.setattr(gui, "render_workers", 1)
+    assert not gui.use_process_pool(10 ** 6)
+    monkeypatch.setattr(gui, "render_workers", 4)
+    assert not gui.use_process_pool(gui.parallel_min_labels - 1)
+    assert gui.use_process_pool(gui.parallel_min_labels)
+
+
+@pytest.mark.usefixtures("font", "pool_settings")
+def test_write_labels_falls_back_when_the_pool_breaks(tmp_path, monkeypatch):
+    monkeypatch.setattr(gui, "make_executor", lambda *args, **kwargs: BrokenExecutor())
+    specs = [LabelSpec("69012345%04d" % i, "S%d" % i, quantity=2) for i in range(5)]
+    path = tmp_path / "labels.pdf"
+    gui.write_labels(str(path), specs)
+    data = path.read_bytes()
+    assert data.endswith(b"%%EOF\n")
+    assert data.count(b"/Subtype /Image") == 5
+
+
+@pytest.mark.usefixtures("font", "pool_settings")
+def test_render_labels_falls_back_when_the_pool_breaks(monkeypatch):
+    monkeypatch.setattr(gui, "make_executor", lambda *args, **kwargs: BrokenExecutor())
+    labels = [{'barcode_code': "69012345%04d" % i, 'style_code': ""} for i in range(3)]
+    gui.render_labels(labels)
+    assert len(render_cache) == 3
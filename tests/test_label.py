@@ -0,0 +1,130 @@
+"""Label sizing: the smallest label size whose barcode is as wide as
+the measured header, and fit_label_params picking the largest
+whole-pixel bar width whose label fits a printer cell"""
+
+import pytest
+
+from Encoder.fonts import get_glyph_advances
+from Encoder.label import (IMAGE_MODULES, LABEL_SIZES, LabelSpec,
+                           _header_font, calculate_barcode_width,
+                           fit_label_params, header_text, label_size,
+                           render_fitted_label, render_label,
+                           render_sized_label, sized_label_key)
+from Encoder.renderer import scaled_digit_step
+
+STYLE_CODES = ["", "A1", "A1234-BLK", "SUPERLONG-STYLE-CODE-2024-XL"]
+
+# narrow and wide glyphs, so the character count alone cannot size them
+HEADER_CODES = ["1", "A1234", "iiiiiiiiiiiiiiiiiiii", "WWWWWWWWWWWW",
+                "AVAV-TOTO-WAWA", "2024-SPRING-A1234", "款号-春季-001",
+                "X" * 60]
+
+
+def header_width(style_code, font_size):
+    return _header_font(font_size).getlength(header_text(style_code))
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("text", ["NO: A1234", "NO: AVAV-TOTO-WAWA", "NO: 款号"])
+@pytest.mark.parametrize("font_size", [22.5, 29, 35])
+def test_glyph_advances_match_text_layout(text, font_size):
+    font = _header_font(font_size)
+    assert get_glyph_advances(font).text_length(text) == \
+        pytest.approx(font.getlength(text), abs=1)
+
+
+def test_empty_style_code_gets_the_smallest_size():
+    params = calculate_barcode_width("")
+    assert params == LABEL_SIZES[0]
+    params['picWidth'] = 99  # callers get a copy
+    assert calculate_barcode_width("")['picWidth'] == LABEL_SIZES[0]['picWidth']
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("style_code", HEADER_CODES)
+def test_smallest_size_that_fits_the_header(style_code):
+    params = calculate_barcode_width(style_code)
+    sizes = [size['picWidth'] for size in LABEL_SIZES]
+    index = sizes.index(params['picWidth'])
+    # every smaller size is too narrow for the header
+    for size in LABEL_SIZES[:index]:
+        assert header_width(style_code, size['frontSize']) > \
+            size['picWidth'] * IMAGE_MODULES
+    # the chosen one fits it, with the header font scaled down if needed
+    assert header_width(style_code, params['frontSize']) <= \
+        params['picWidth'] * IMAGE_MODULES + 1
+    if params['frontSize'] != LABEL_SIZES[index]['frontSize']:
+        assert index == len(LABEL_SIZES) - 1
+        assert params['frontSize'] < LABEL_SIZES[index]['frontSize']
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("style_code", HEADER_CODES[:4] + [""])
+def test_label_size_matches_the_rendered_label(style_code):
+    params = calculate_barcode_width(style_code)
+    image = render_sized_label("690123456789", style_code, cache=None)
+    assert image.size == label_size(style_code, params)
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("style_code", STYLE_CODES)
+@pytest.mark.parametrize("dpi", [203, 300, 600])
+def test_fitted_label_fits_its_cell(style_code, dpi):
+    box = (90 * dpi // 72, 45 * dpi // 72)
+    params = fit_label_params(style_code, *box)
+    bar_width = params['picWidth']
+    assert 1 <= bar_width <= box[0] // IMAGE_MODULES
+    width, height = label_size(style_code, params)
+    assert width == bar_width * IMAGE_MODULES <= box[0]
+    assert height <= box[1]
+
+    image = render_fitted_label("690123456789", style_code, *box, cache=None)
+    assert image.size == (width, height)
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("style_code", STYLE_CODES)
+def test_fitted_label_uses_the_widest_bars_that_fit(style_code):
+    box = (750, 375)  # a 90 x 45 pt cell at 600 dpi
+    bar_width = fit_label_params(style_code, *box)['picWidth']
+    if bar_width < box[0] // IMAGE_MODULES:
+        # one pixel wider would have been too tall for the cell
+        wider = fit_label_params(style_code, (bar_width + 1) * IMAGE_MODULES, 10 ** 6)
+        assert label_size(style_code, wider)[1] > box[1]
+
+
+@pytest.mark.usefixtures("font")
+def test_printer_path_scales_the_digit_step():
+    box = (750, 375)
+    params = fit_label_params("A1", *box)
+    assert params['picWidth'] >= 5
+    options = dict(bar_width=params['picWidth'],
+                   fontSize=params['numberFontSize'],
+                   spacing=params['spacing'],
+                   headerFontSize=params['frontSize'], cache=None)
+    fitted = render_fitted_label("690123456789", "A1", *box, cache=None)
+    scaled = render_label("690123456789", "A1", digitStep=scaled_digit_step(
+        params['picWidth']), **options)
+    default = render_label("690123456789", "A1", **options)
+    assert fitted.tobytes() == scaled.tobytes()
+    assert fitted.tobytes() != default.tobytes()
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("code, style_code", [
+    ("690123456789", ""), ("6901234567892", "A1234"),
+    ("６９０１２３４５６７８９", "AVAV-TOTO-WAWA"), ("400638133393", "X" * 40),
+])
+def test_label_spec_renders_like_render_sized_label(code, style_code):
+    spec = LabelSpec(code, style_code, quantity=3, item_id=7)
+    assert spec.key() == sized_label_key(code, style_code)
+    assert spec.render(cache=None).tobytes() == \
+        render_sized_label(code, style_code, cache=None).tobytes()
+    assert spec.as_label() == {'style_code': style_code, 'barcode_code': code,
+                               'quantity': 3, 'itemID': 7}
+
+
+@pytest.mark.parametrize("code", ["", "12345", "6901234567x9", "69012345678²"])
+def test_label_spec_rejects_bad_codes(code):
+    with pytest.raises(Exception):
+        LabelSpec(code)
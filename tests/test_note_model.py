@@ -0,0 +1,131 @@
+"""The delivery note model keeps its running total in integer cents
+equal to a full recalculation after any sequence of edits"""
+
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from shipment_manager.note_model import (DeliveryNoteModel, amount_cents,
+                                         format_fixed, to_fixed)
+
+COLUMNS = ['货号', '名称', '规格', '单位', '数量', '单价', '金额', '备注']
+
+
+def expected_cents(quantity, price):
+    amount = (Decimal(quantity) * Decimal(price)).quantize(
+        Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return int(amount * 100)
+
+
+def recalculated(model):
+    """The total recomputed in Decimal from the displayed cells"""
+    qty, price = model.column_index('数量'), model.column_index('单价')
+    return sum(expected_cents(model.text(row, qty), model.text(row, price))
+               for row in range(model.rowCount()))
+
+
+@pytest.mark.parametrize("quantity, price", [
+    ("3", "1.005"), ("-3", "1.005"), ("0.5", "0.01"), ("1", "0.005"),
+    ("12.3456", "7.8901"), ("0", "99"),
+])
+def test_amount_rounds_half_up_to_cents(quantity, price):
+    assert amount_cents(to_fixed(quantity), to_fixed(price)) == \
+        expected_cents(quantity, price)
+
+
+def test_running_total_matches_recalculation():
+    rng = random.Random(0)
+    model = DeliveryNoteModel(COLUMNS)
+    model.set_rows([{'数量': rng.randint(0, 50), '单价': "%.2f" % rng.uniform(0, 100)}
+                    for _ in range(300)])
+    assert model.total_cents == recalculated(model)
+    qty, price = model.column_index('数量'), model.column_index('单价')
+    for _ in range(500):
+        action = rng.random()
+        rows = model.rowCount()
+        if action < 0.6 and rows:
+            model.setData(model.index(rng.randrange(rows), rng.choice((qty, price))),
+                          "%.3f" % rng.uniform(-10, 100))
+        elif action < 0.8:
+            model.insert_rows(rng.randint(0, rows),
+                              [{'数量': rng.randint(1, 9), '单价': "1.005"}] * rng.randint(1, 3))
+        elif rows:
+            model.remove_rows(rng.randrange(rows), rng.randint(1, 3))
+        assert model.total_cents == recalculated(model)
+
+
+def test_column_changes_recalculate_total():
+    model = DeliveryNoteModel(COLUMNS)
+    model.set_rows([{'数量': 2, '单价': "2.5"}, {'数量': 1, '单价': 10}])
+    assert model.total_cents == 1500
+    col = model.column_index('数量')
+    model.rename_column(col, '件数')
+    assert model.total_cents == 0
+    model.rename_column(col, '数量')
+    assert model.total_cents == 1500
+    model.insert_column(0, '新列')
+    assert model.column_index('数量') == col + 1
+    assert model.total_cents == 1500
+    model.remove_column(model.column_index('单价'))
+    assert model.total_cents == 0
+
+
+@pytest.mark.parametrize("name", ['数量', '单价', '金额'])
+def test_renaming_the_row_number_column(name):
+    # the row numbers are computed, so the column never takes part in the
+    # amounts, whatever it is called
+    model = DeliveryNoteModel(COLUMNS)
+    model.set_rows([{'数量': 2, '单价': "2.5"}, {'数量': 1, '单价': 10}])
+    model.rename_column(0, name)
+    assert model.headers()[0] == name
+    assert model.column_index(name) == COLUMNS.index(name)
+    assert model.total_cents == 1500
+    assert [model.text(row, 0) for row in range(2)] == ["1", "2"]
+    model.insert_rows(0, [{'数量': 1, '单价': 1}])
+    assert model.total_cents == 1600
+    assert model.text(2, 0) == "3"
+    model.rename_column(0, '货号')
+    assert model.total_cents == 1600
+
+
+@pytest.mark.parametrize("text", ["nan", "inf", "-Infinity", "sNaN", "abc", "1e30"])
+def test_rejects_non_numbers(text):
+    model = DeliveryNoteModel(COLUMNS)
+    model.set_rows([{'数量': 2, '单价': 3}])
+    assert not model.setData(model.index(0, 4), text)
+    assert model.text(0, 4) == "2"
+    assert model.total_cents == 600
+
+
+def test_non_numbers_in_new_rows_read_as_zero():
+    model = DeliveryNoteModel(COLUMNS)
+    model.set_rows([{'数量': 'nan', '单价': 3}, {'数量': 'inf', '单价': 'x'}])
+    assert [model.text(row, 4) for row in range(2)] == ["0", "0"]
+    assert model.total_cents == 0
+
+
+def test_format_fixed():
+    assert [format_fixed(to_fixed(text)) for text in ("25", "2.50", "-0.5", "", "1.23456")] == \
+        ["25", "2.5", "-0.5", "0", "1.2346"]
+
+
+def test_cells_are_stored_by_column():
+    model = DeliveryNoteModel(COLUMNS)
+    model.set_rows([{'名称': '布料', '数量': '2.5', '单价': '4', '备注': 7}])
+    assert [model.text(0, col) for col in range(len(COLUMNS))] == \
+        ["1", "布料", "", "", "2.5", "4", "10.00", "7"]
+    assert model.setData(model.index(0, 1), "纽扣")
+    assert not model.setData(model.index(0, 6), "99")  # the amount is computed
+    assert model.headers() == COLUMNS
+
+
+def test_row_numbers_follow_the_row_index():
+    model = DeliveryNoteModel(COLUMNS)
+    model.set_rows([{'名称': name} for name in "abc"])
+    model.insert_rows(0, [{'名称': 'z'}])
+    model.remove_rows(2)
+    assert [model.text(row, 0) for row in range(3)] == ["1", "2", "3"]
+    assert [model.text(row, 1) for row in range(3)] == ["z", "a", "c"]
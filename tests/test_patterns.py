@@ -0,0 +1,47 @@
+"""encode_many must give the same bars and check digits as EAN13Encoder"""
+
+import random
+
+import pytest
+
+from Encoder import EAN13Encoder, encode_many
+from Encoder.patterns import encode_pattern
+
+
+def random_codes(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice("0123456789") for _ in range(12))
+            for _ in range(count)]
+
+
+def test_encode_many_matches_encoder():
+    codes = random_codes(500)
+    for code, pattern in zip(codes, encode_many(codes)):
+        encoder = EAN13Encoder(code)
+        assert pattern.full_code == encoder.full_code
+        assert pattern.left_bars == encoder.left_bars
+        assert pattern.right_bars == encoder.right_bars
+        assert len(pattern.modules) == 95
+
+
+def test_thirteenth_digit_is_recalculated():
+    # a wrong check digit is replaced, as EAN13Encoder does
+    assert encode_pattern("6901234567890").full_code == \
+        EAN13Encoder("6901234567890").full_code == "6901234567892"
+
+
+def test_full_width_digits():
+    code = "６９０１２３４５６７８９"
+    assert encode_pattern(code).full_code == EAN13Encoder(code).full_code
+    assert encode_pattern(code).modules == encode_pattern("690123456789").modules
+
+
+@pytest.mark.parametrize("code", [
+    "", "12345", "69012345678", "69012345678901", "6901234567x9",
+    "69012345678²", " 69012345678",
+])
+def test_rejects_what_the_encoder_rejects(code):
+    with pytest.raises(Exception):
+        EAN13Encoder(code)
+    with pytest.raises(Exception):
+        encode_pattern(code)
@@ -0,0 +1,41 @@
+"""Previews wrap the pixel bytes of the PIL image without a second copy
+and look the same as from an owned QImage"""
+
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from PIL import Image, ImageDraw
+from PyQt5.QtCore import Qt
+
+from barcode_generator.render_worker import pil_to_qimage, preview_qimage
+
+
+def sample(mode="L"):
+    image = Image.new("L", (227, 113), 255)  # odd width: unpadded rows
+    ImageDraw.Draw(image).rectangle((20, 10, 60, 100), fill=0)
+    return image.convert(mode)
+
+
+def qimage_bytes(qimage):
+    return b"".join(bytes(qimage.constScanLine(y).asarray(qimage.bytesPerLine()))
+                    [:qimage.width() * (qimage.depth() // 8)]
+                    for y in range(qimage.height()))
+
+
+@pytest.mark.parametrize("mode", ["L", "1", "RGB"])
+def test_wrapped_image_has_the_pixels(mode):
+    image = sample(mode)
+    wrapped = pil_to_qimage(image, copy=False)
+    owned = pil_to_qimage(image)
+    expected = image.convert("L" if mode == "1" else mode).tobytes()
+    assert qimage_bytes(wrapped) == qimage_bytes(owned) == expected
+
+
+def test_preview_matches_scaling_an_owned_copy():
+    image = sample()
+    preview = preview_qimage(image, (100, 40))
+    expected = pil_to_qimage(image).scaled(100, 40, Qt.KeepAspectRatio,
+                                           Qt.SmoothTransformation)
+    assert preview.size() == expected.size()
+    assert preview == expected
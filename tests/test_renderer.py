@@ -0,0 +1,103 @@
+"""The run-length rectangle rasterizer must match the original
+putpixel writer pixel for pixel"""
+
+import pytest
+
+from Encoder import EAN13Encoder
+from Encoder.encoding import GUARDS
+from Encoder.renderer import (EAN13Renderer, convert_mode, digit_step,
+                              module_dpi, scaled_digit_step, write_png)
+from Encoder.vector import EAN13SVGRenderer
+
+CODES = ["012345678901", "690123456789", "400638133393", "999999999999",
+         "000000000000"]
+
+
+def render(code, engine, bar_width, **options):
+    encoder = EAN13Encoder(code)
+    renderer = EAN13Renderer(encoder.full_code, encoder.left_bars,
+                             encoder.right_bars, GUARDS, engine=engine)
+    return renderer.get_pilimage(bar_width, **options)
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("code", CODES)
+@pytest.mark.parametrize("bar_width", [1, 2, 3, 4, 5, 6])
+def test_rect_matches_putpixel(code, bar_width):
+    expected = render(code, "putpixel", bar_width)
+    actual = render(code, "rect", bar_width)
+    assert actual.mode == expected.mode
+    assert actual.size == expected.size
+    assert actual.tobytes() == expected.tobytes()
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("options", [
+    {"fontSize": 8}, {"fontSize": 27.5}, {"spacing": 1.35},
+    {"fontSize": 14, "spacing": 0.8}, {"mode": "1"},
+])
+def test_rect_matches_putpixel_with_options(options):
+    expected = render("690123456789", "putpixel", 3, **options)
+    actual = render("690123456789", "rect", 3, **options)
+    assert actual.tobytes() == expected.tobytes()
+
+
+@pytest.mark.usefixtures("font")
+def test_one_bit_mode_thresholds_grayscale():
+    grey = render("690123456789", "rect", 2)
+    black_and_white = render("690123456789", "rect", 2, mode="1")
+    assert black_and_white.mode == "1"
+    assert black_and_white.tobytes() == convert_mode(grey, "1").tobytes()
+
+
+@pytest.mark.usefixtures("font")
+def test_png_keeps_mode_and_dpi(tmp_path):
+    from PIL import Image
+
+    grey = render("690123456789", "rect", 2)
+    write_png(grey, str(tmp_path / "grey.png"))
+    write_png(grey, str(tmp_path / "bw.png"), mode="1", dpi=module_dpi(2))
+    with Image.open(str(tmp_path / "grey.png")) as image:
+        assert image.mode == "L"
+        assert "dpi" not in image.info
+        assert image.tobytes() == grey.tobytes()
+    with Image.open(str(tmp_path / "bw.png")) as image:
+        assert image.mode == "1"
+        assert [round(d) for d in image.info["dpi"]] == [154, 154]
+
+
+@pytest.mark.parametrize("bar_width", [1, 2, 3, 4, 5, 6, 7])
+def test_default_digit_step_is_unchanged(bar_width):
+    # the original renderer's rule: font_sizes, and 24 past its end
+    assert digit_step(bar_width) == {1: 8, 2: 14, 3: 18, 4: 24}.get(bar_width, 24)
+    if bar_width > 4:
+        assert scaled_digit_step(bar_width) == 6 * bar_width
+    else:
+        assert scaled_digit_step(bar_width) == digit_step(bar_width)
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("engine", ["rect", "putpixel"])
+def test_digit_step_override(engine):
+    default = render("690123456789", engine, 6)
+    assert default.tobytes() == render("690123456789", engine, 6,
+                                       digitStep=24).tobytes()
+    assert default.tobytes() != render("690123456789", engine, 6,
+                                       digitStep=36).tobytes()
+
+
+@pytest.mark.parametrize("bar_width", [1, 2, 3, 4, 5, 6, 8])
+def test_vector_digits_use_raster_digit_step(bar_width):
+    encoder = EAN13Encoder("690123456789")
+    layout = EAN13SVGRenderer(encoder.full_code, encoder.left_bars,
+                              encoder.right_bars, GUARDS).get_layout(bar_width)
+    step = digit_step(bar_width)
+    xs = [x for x, _, _ in layout.digits]
+    assert xs[0] == bar_width
+    assert xs[1:7] == [13 * bar_width + i * step for i in range(6)]
+    assert xs[7:] == [59 * bar_width + i * step for i in range(6)]
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(Exception):
+        EAN13Renderer("6901234567892", "", "", GUARDS, engine="numpy")
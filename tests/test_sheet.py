@@ -0,0 +1,64 @@
+"""The streaming sheet writer produces a well formed cross reference
+table and writes each distinct label once, as a PDF form that repeated
+cells refer to"""
+
+import re
+
+import pytest
+
+from Encoder.sheet import max_items_per_page, write_label_sheet
+
+
+def read_pdf(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def check_xref(data):
+    """Every xref entry must point at the start of its object"""
+    startxref = int(re.search(rb"startxref\n(\d+)\n%%EOF", data).group(1))
+    assert data[startxref:].startswith(b"xref\n")
+    header = re.match(rb"xref\n0 (\d+)\n", data[startxref:])
+    count = int(header.group(1))
+    entries = data[startxref + header.end():].split(b"\n")[1:count]
+    for number, entry in enumerate(entries, 1):
+        offset = int(entry[:10])
+        assert data[offset:].startswith(b"%d 0 obj\n" % number)
+    assert re.search(rb"/Size %d " % count, data)
+
+
+def labels(count, quantity=3):
+    return [{'barcode_code': '69012345%04d' % i, 'style_code': 'S%d' % i,
+             'quantity': quantity} for i in range(count)]
+
+
+def test_vector_labels_are_written_once(tmp_path):
+    path = str(tmp_path / "labels.pdf")
+    # the same labels twice: forms are written once and referred to again
+    placed = write_label_sheet(path, labels(50) + labels(50), vector=True)
+    data = read_pdf(path)
+    check_xref(data)
+    assert placed == 300
+    assert data.count(b"/Subtype /Form") == 50
+    pages = -(-placed // max_items_per_page)
+    assert data.count(b"/Type /Page ") == pages
+    assert b"/Count %d" % pages in data
+
+
+def test_empty_sheet_has_one_blank_page(tmp_path):
+    path = str(tmp_path / "empty.pdf")
+    assert write_label_sheet(path, []) == 0
+    data = read_pdf(path)
+    check_xref(data)
+    assert b"/Count 1" in data
+
+
+@pytest.mark.usefixtures("font")
+@pytest.mark.parametrize("dpi", [None, 300])
+def test_raster_sheet_embeds_each_label_once(tmp_path, dpi):
+    path = str(tmp_path / "labels.pdf")
+    write_label_sheet(path, labels(5) * 4, dpi=dpi)
+    data = read_pdf(path)
+    check_xref(data)
+    assert data.count(b"/Subtype /Form") == 5
+    assert data.count(b"/Subtype /Image") == 5